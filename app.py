@@ -1,20 +1,179 @@
-from flask import Flask, render_template, request, make_response, redirect
+from flask import Flask, Response, render_template, request, make_response, redirect, stream_with_context, send_file, g
 from datetime import date, datetime
-import json, re, os, sqlite3, secrets, string
+import json, re, os, io, sqlite3, secrets, string, threading, queue, atexit, time, math, hashlib, hmac, functools, zipfile, zlib, bisect, contextlib, random, cProfile, pstats, importlib.metadata
+import click
+from collections import deque, OrderedDict, namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait as wait_futures, FIRST_COMPLETED
 from pathlib import Path
 from playwright.sync_api import sync_playwright
+try: from pypdf import PdfReader, PdfWriter
+except ImportError: PdfReader = PdfWriter = None
+try: import msgpack
+except ImportError: msgpack = None
+try: from xhtml2pdf import pisa
+except ImportError: pisa = None
 
 APP_DIR = Path(__file__).parent
 import os
 DB_PATH = Path(os.environ.get('DB_PATH', str(APP_DIR / 'quickcv.db')))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_MMAP_MB = int(os.environ.get('DB_MMAP_MB', '64'))
+STORE_CODEC = os.environ.get('STORE_CODEC', 'msgpack' if msgpack else 'json')
+STORE_ZLIB_LEVEL = int(os.environ.get('STORE_ZLIB_LEVEL', '6'))
+SAVE_BATCH_MS = float(os.environ.get('SAVE_BATCH_MS', '0'))
+SAVE_BATCH_MAX = int(os.environ.get('SAVE_BATCH_MAX', '256'))
+SAVE_TIMEOUT = float(os.environ.get('SAVE_TIMEOUT', '10'))
+SLUG_BLOCK = int(os.environ.get('SLUG_BLOCK', '1000'))
+PDF_POOL_SIZE = int(os.environ.get('PDF_POOL_SIZE', '2'))
+PDF_POOL_MAX_RENDERS = int(os.environ.get('PDF_POOL_MAX_RENDERS', '200'))
+PDF_POOL_MAX_RSS_MB = int(os.environ.get('PDF_POOL_MAX_RSS_MB', '1024'))
+PDF_RENDER_TIMEOUT = float(os.environ.get('PDF_RENDER_TIMEOUT', '30'))
+PDF_QUEUE_MAX = int(os.environ.get('PDF_QUEUE_MAX', str(PDF_POOL_SIZE * 4)))
+PDF_QUEUE_WAIT = float(os.environ.get('PDF_QUEUE_WAIT', '10'))
+PDF_BACKGROUND_WAIT = float(os.environ.get('PDF_BACKGROUND_WAIT', '600'))
+PDF_CACHE_MEMORY_MB = int(os.environ.get('PDF_CACHE_MEMORY_MB', '64'))
+PDF_CACHE_DISK_MB = int(os.environ.get('PDF_CACHE_DISK_MB', '1024'))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '500'))
+SCORE_BATCH_MAX_ITEMS = int(os.environ.get('SCORE_BATCH_MAX_ITEMS', '10000'))
+SCORE_CACHE_ENTRIES = int(os.environ.get('SCORE_CACHE_ENTRIES', '20000'))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+PDF_CACHE_DIR = Path(os.environ.get('PDF_CACHE_DIR', str(APP_DIR / 'pdf_cache')))
+ARTIFACT_DIR = Path(os.environ.get('ARTIFACT_DIR', str(APP_DIR / 'artifacts')))
+ARTIFACT_DISK_MB = int(os.environ.get('ARTIFACT_DISK_MB', '2048'))
+PRERENDER = os.environ.get('PRERENDER', '1') == '1'
+PRERENDER_QUEUE_MAX = int(os.environ.get('PRERENDER_QUEUE_MAX', '1000'))
+
+TEMPLATE_RELOAD = os.environ.get('TEMPLATE_RELOAD', '') == '1'
+SHARE_CACHE_MB = int(os.environ.get('SHARE_CACHE_MB', '32'))
+SHARE_MAX_AGE = int(os.environ.get('SHARE_MAX_AGE', '300'))
+STREAM_CHUNK_KB = int(os.environ.get('STREAM_CHUNK_KB', '16'))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '2000'))
+SLOW_REQUEST_SAMPLES = int(os.environ.get('SLOW_REQUEST_SAMPLES', '50'))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', str(APP_DIR / 'profiles')))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '100'))
+# any change to the rendering code invalidates validators handed out earlier
+RENDER_VERSION = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:8]
+
+PDF_CV_OPTIONS = {"format":"A4", "print_background":True, "margin":{"top":"12mm","bottom":"12mm","left":"12mm","right":"12mm"}}
+PDF_COVER_OPTIONS = {"format":"A4", "print_background":True, "margin":{"top":"18mm","bottom":"18mm","left":"18mm","right":"18mm"}}
+# per-template PDF backend, e.g. "cv_compact=xhtml2pdf,cv_classic=xhtml2pdf"
+PDF_BACKENDS = os.environ.get('PDF_BACKENDS', '')
+PDF_FONT_DIR = Path(os.environ.get('PDF_FONT_DIR', str(APP_DIR / 'fonts')))
+PDF_LAUNCH_ARGS = ["--disable-gpu", "--disable-dev-shm-usage", "--disable-extensions", "--disable-background-networking",
+                   "--disable-component-update", "--disable-default-apps", "--disable-sync", "--no-first-run",
+                   "--mute-audio", "--font-render-hinting=none"]
 
 app = Flask(__name__)
+# let a fronting nginx/Apache send files named by X-Sendfile
+app.config["USE_X_SENDFILE"] = os.environ.get('USE_X_SENDFILE', '') == '1'
 
-def db():
-    conn = sqlite3.connect(DB_PATH)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Metrics:
+    # Counters and histograms in the Prometheus text format, without the
+    # client library. Labels are kwargs; keep their values low-cardinality.
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock: self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None: h = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            h[1] += seconds
+
+    def render(self, extra=()):
+        # extra: (name, type, labels, value) read from the components' own stats
+        fmt = lambda labels: "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, (list(h[0]), h[1])) for k, h in self.histograms.items())
+        out, typed = [], set()
+        def typeline(name, kind):
+            if name not in typed:
+                typed.add(name)
+                out.append(f"# TYPE {name} {kind}")
+        for (name, labels), value in counters:
+            typeline(name, "counter")
+            out.append(f"{name}{fmt(labels)} {value}")
+        for (name, labels), (counts, total) in histograms:
+            typeline(name, "histogram")
+            cumulative = 0
+            for le, n in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += n
+                out.append(f"{name}_bucket{fmt(labels + (('le', le),))} {cumulative}")
+            out.append(f"{name}_sum{fmt(labels)} {round(total, 6)}")
+            out.append(f"{name}_count{fmt(labels)} {cumulative}")
+        for name, kind, labels, value in sorted(extra, key=lambda m: m[0]):
+            typeline(name, kind)
+            out.append(f"{name}{fmt(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(out) + "\n"
+
+metrics = Metrics()
+_stages = threading.local()
+slow_requests = deque(maxlen=max(1, SLOW_REQUEST_SAMPLES))
+
+def record_stage(name, seconds):
+    metrics.observe("quickcv_stage_seconds", seconds, stage=name)
+    current = getattr(_stages, "current", None)
+    if current is not None: current[name] = current.get(name, 0.0) + seconds
+
+@contextlib.contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try: yield
+    finally: record_stage(name, time.perf_counter() - started)
+
+def timed_iter(name, pieces):
+    # only the time spent producing pieces, not waiting on a slow client
+    total, it = 0.0, iter(pieces)
+    while True:
+        started = time.perf_counter()
+        try: piece = next(it)
+        except StopIteration: break
+        finally: total += time.perf_counter() - started
+        yield piece
+    record_stage(name, total)
+
+SQL_SHARED_BY_SLUG = "SELECT data_json, schema, template, created_at FROM cv_store WHERE slug=?"
+SQL_INSERT_SHARED = "INSERT INTO cv_store(slug, data_json, schema, template, created_at) VALUES(?,?,?,?,?)"
+SQL_SHARED_META = "SELECT template, created_at FROM cv_store WHERE slug=?"
+SQL_MIGRATE_SHARED = "UPDATE cv_store SET data_json=?, schema=? WHERE slug=? AND schema=?"
+
+# cv_store.schema says how data_json is encoded. Rows written before the
+# column existed are plain JSON text (0) and are re-encoded when next read.
+SCHEMA_JSON, SCHEMA_JSON_ZLIB, SCHEMA_MSGPACK_ZLIB = 0, 1, 2
+STORE_SCHEMA = SCHEMA_MSGPACK_ZLIB if STORE_CODEC == "msgpack" and msgpack else SCHEMA_JSON_ZLIB
+
+_db_local = threading.local()
+
+def connect_db():
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000, cached_statements=64)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_MB * 1024 * 1024}")
     return conn
 
+def db():
+    # One connection per thread, reused across requests so the sqlite3
+    # statement cache keeps the slug lookup prepared. A forked worker must
+    # not share its parent's connection, hence the pid check.
+    if getattr(_db_local, "pid", None) != os.getpid():
+        _db_local.conn = connect_db()
+        _db_local.pid = os.getpid()
+    return _db_local.conn
+
 def init_db():
     conn = db()
     conn.execute("""
@@ -23,15 +182,110 @@ def init_db():
         slug TEXT UNIQUE NOT NULL,
         data_json TEXT NOT NULL,
         template TEXT NOT NULL,
-        created_at TEXT NOT NULL
+        created_at TEXT NOT NULL,
+        schema INTEGER NOT NULL DEFAULT 0
     )
     """)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta(name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    if "schema" not in {r["name"] for r in conn.execute("PRAGMA table_info(cv_store)")}:
+        try: conn.execute("ALTER TABLE cv_store ADD COLUMN schema INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError as e:
+            # another worker added it first
+            if "duplicate column" not in str(e): raise
     conn.commit()
-    conn.close()
 
-def gen_slug(n=7):
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(n))
+init_db()
+
+def encode_cv(data, schema=None):
+    schema = STORE_SCHEMA if schema is None else schema
+    if schema == SCHEMA_MSGPACK_ZLIB:
+        # msgpack only holds 64-bit integers; json.loads accepts any size
+        try: raw = msgpack.packb(data)
+        except (OverflowError, TypeError): return encode_cv(data, SCHEMA_JSON_ZLIB)
+    elif schema == SCHEMA_JSON_ZLIB: raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    else: return schema, json.dumps(data)
+    return schema, zlib.compress(raw, STORE_ZLIB_LEVEL)
+
+def decode_cv(schema, blob):
+    if schema == SCHEMA_MSGPACK_ZLIB:
+        if msgpack is None: raise RuntimeError("cv_store row needs msgpack, which is not installed")
+        return msgpack.unpackb(zlib.decompress(blob))
+    if schema == SCHEMA_JSON_ZLIB: return json.loads(zlib.decompress(blob))
+    if schema == SCHEMA_JSON: return json.loads(blob)
+    raise ValueError(f"Unknown cv_store schema {schema}")
+
+def migrate_row(slug, schema, data):
+    new_schema, blob = encode_cv(data)
+    if new_schema == schema: return
+    try:
+        with stage("db"), db() as conn: conn.execute(SQL_MIGRATE_SHARED, (blob, new_schema, slug, schema))
+    except sqlite3.OperationalError:
+        pass  # busy; the row is migrated on a later read
+
+class SlugAllocator:
+    # Slugs are sequential IDs put through a keyed Feistel permutation of
+    # [0, 62**8) and written as 8 base62 characters: unique by construction
+    # and not guessable without the key. Each process reserves SLUG_BLOCK IDs
+    # at a time, so only one save in a block touches the meta table. Older
+    # 7-character random slugs can never collide with these.
+    ALPHABET = string.digits + string.ascii_letters
+    LENGTH = 8
+    SPACE = 62 ** 8
+    HALF_BITS = 24
+
+    def __init__(self, block=SLUG_BLOCK):
+        self.block = max(1, block)
+        self.lock = threading.Lock()
+        self.pid = None
+        self.key = None
+        self.next_id = self.end_id = 0
+
+    def reserve(self):
+        # Own connection, so callers must take their slugs before opening a
+        # save transaction: BEGIN IMMEDIATE here would wait on that
+        # transaction's write lock until the busy timeout.
+        conn = connect_db()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("INSERT OR IGNORE INTO meta(name, value) VALUES('slug_key', ?)", (secrets.token_hex(32),))
+                conn.execute("INSERT OR IGNORE INTO meta(name, value) VALUES('slug_next', '1')")
+                key = conn.execute("SELECT value FROM meta WHERE name='slug_key'").fetchone()[0]
+                start = int(conn.execute("SELECT value FROM meta WHERE name='slug_next'").fetchone()[0])
+                conn.execute("UPDATE meta SET value=? WHERE name='slug_next'", (str(start + self.block),))
+        finally:
+            conn.close()
+        self.key, self.next_id, self.end_id = bytes.fromhex(key), start, start + self.block
+
+    def permute(self, n):
+        # a 48-bit Feistel network, cycle-walked back into the slug space
+        half, mask = self.HALF_BITS, (1 << self.HALF_BITS) - 1
+        while True:
+            left, right = n >> half, n & mask
+            for i in range(4):
+                mac = hmac.new(self.key, bytes([i]) + right.to_bytes(3, "big"), hashlib.sha256).digest()
+                left, right = right, left ^ int.from_bytes(mac[:3], "big")
+            n = (left << half) | right
+            if n < self.SPACE: return n
+
+    def encode(self, n):
+        out = []
+        for _ in range(self.LENGTH):
+            n, r = divmod(n, 62)
+            out.append(self.ALPHABET[r])
+        return "".join(reversed(out))
+
+    def next(self):
+        with self.lock:
+            # a block inherited over fork would be handed out twice
+            if self.pid != os.getpid() or self.next_id >= self.end_id:
+                self.reserve()
+                self.pid = os.getpid()
+            n = self.next_id
+            self.next_id += 1
+        return self.encode(self.permute(n))
+
+slug_allocator = SlugAllocator()
 
 def safe_get(d, k, default=""): return d.get(k, default) if isinstance(d, dict) else default
 
@@ -50,56 +304,145 @@ def date_range(start, end):
     if e: return e
     return ""
 
-def as_bullets(items):
-    if not items: return ""
-    clean = [x for x in items if str(x).strip()]
-    if not clean: return ""
-    return "<ul class='bullets'>" + "".join(f"<li>{x}</li>" for x in clean) + "</ul>"
+def iter_bullets(items):
+    clean = [x for x in items or () if str(x).strip()]
+    if not clean: return
+    yield "<ul class='bullets'>"
+    for x in clean: yield f"<li>{x}</li>"
+    yield "</ul>"
+
+def as_bullets(items): return "".join(iter_bullets(items))
 
-def render_experience(items):
-    if not items: return ""
-    out=[]
-    for j in items:
+def iter_experience(items):
+    for j in items or ():
         if not has_content(j): continue
         title = safe_get(j,'title'); company = safe_get(j,'company'); loc = safe_get(j,'location')
         when = date_range(safe_get(j,'start'), safe_get(j,'end'))
         header_parts = [p for p in [title, company] if p]
         header = " — ".join(header_parts) if header_parts else ""
         meta = " · ".join([p for p in [loc, when] if p])
-        out.append(
-            "<div class='item'>"
-            + (f"<div class='item-h'><strong>{header}</strong></div>" if header else "")
-            + (f"<div class='item-m'>{meta}</div>" if meta else "")
-            + as_bullets(j.get('highlights', []))
-            + "</div>"
-        )
-    return "".join(out)
-
-def render_education(items):
-    if not items: return ""
-    out=[]
-    for ed in items:
+        yield "<div class='item'>"
+        if header: yield f"<div class='item-h'><strong>{header}</strong></div>"
+        if meta: yield f"<div class='item-m'>{meta}</div>"
+        yield from iter_bullets(j.get('highlights', []))
+        yield "</div>"
+
+def render_experience(items): return "".join(iter_experience(items))
+
+def iter_education(items):
+    for ed in items or ():
         if not has_content(ed): continue
         qual = safe_get(ed,'qualification'); inst = safe_get(ed,'institution')
         when = date_range(safe_get(ed,'start'), safe_get(ed,'end'))
         header_parts = [p for p in [qual, inst] if p]
         header = " — ".join(header_parts) if header_parts else ""
-        out.append(
-            "<div class='item'>"
-            + (f"<div class='item-h'><strong>{header}</strong></div>" if header else "")
-            + (f"<div class='item-m'>{when}</div>" if when else "")
-            + (f"<p class='item-p'>{safe_get(ed,'details')}</p>" if safe_get(ed,'details') else "")
-            + "</div>"
-        )
-    return "".join(out)
-
-def render_with_placeholders(template_html, keys):
-    def repl(m): return str(keys.get(m.group(1), ""))
-    return re.sub(r"\[\[(\w+)\]\]", repl, template_html)
-
-def render_cv_html(data, template_html):
+        yield "<div class='item'>"
+        if header: yield f"<div class='item-h'><strong>{header}</strong></div>"
+        if when: yield f"<div class='item-m'>{when}</div>"
+        if safe_get(ed,'details'): yield f"<p class='item-p'>{safe_get(ed,'details')}</p>"
+        yield "</div>"
+
+def render_education(items): return "".join(iter_education(items))
+
+RAW_TEXT_RE = re.compile(r"<(title|style|script|textarea)\b[^>]*>(?:(?!</\1).)*$", re.S | re.I)
+
+class CompiledTemplate:
+    # re.split with a capturing group alternates literal text and placeholder
+    # names, so rendering is one join with the slots filled in.
+    def __init__(self, source, path=None, mtime=None):
+        self.source = source
+        self.parts = re.split(r"\[\[(\w+)\]\]", source)
+        self.slots = [(i, self.parts[i]) for i in range(1, len(self.parts), 2)]
+        self.version = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+        self.path = path
+        self.name = path.stem if path else None
+        self.mtime = mtime
+        self.marked, self.patchable = self.mark_slots()
+
+    def mark_slots(self):
+        # For live preview, slots in element content get comment markers the
+        # client can patch between. Slots inside <title> are left alone (the
+        # preview never shows them); one inside a tag, <style> or <script>
+        # makes its key unpatchable, so a change to it needs the full page.
+        marked, fixed, prefix = set(), set(), ""
+        for i, name in self.slots:
+            prefix += self.parts[i - 1]
+            raw = RAW_TEXT_RE.search(prefix)
+            if prefix.rfind("<") > prefix.rfind(">") or (raw and raw.group(1).lower() != "title"): fixed.add(name)
+            elif not raw: marked.add(i)
+        return marked, {name for _, name in self.slots} - fixed
+
+    def render(self, keys):
+        out = list(self.parts)
+        for i, name in self.slots: out[i] = str(keys.get(name, ""))
+        return "".join(out)
+
+    def iter_render(self, keys):
+        # A callable value is a fragment generator, called per occurrence.
+        for i, part in enumerate(self.parts):
+            if not i % 2: yield part
+            else:
+                value = keys.get(part, "")
+                if callable(value): yield from value()
+                else: yield str(value)
+
+    def render_marked(self, keys):
+        out = list(self.parts)
+        for i, name in self.slots:
+            value = str(keys.get(name, ""))
+            out[i] = f"<!--[[{name}]]-->{value}<!--/[[{name}]]-->" if i in self.marked else value
+        return "".join(out)
+
+class TemplateStore:
+    def __init__(self, root, reload=TEMPLATE_RELOAD):
+        self.root = Path(root)
+        self.reload = reload
+        self.lock = threading.Lock()
+        self.templates = {}
+        for path in sorted(self.root.glob("cv_*.html")) + sorted(self.root.glob("cover_*.html")):
+            self.load(path)
+
+    def load(self, path):
+        st = path.stat()
+        tpl = CompiledTemplate(path.read_text(encoding="utf-8"), path, st.st_mtime_ns)
+        with self.lock: self.templates[path.stem] = tpl
+        return tpl
+
+    def refresh(self, name):
+        path = self.root / f"{name}.html"
+        try: mtime = path.stat().st_mtime_ns
+        except OSError:
+            with self.lock: self.templates.pop(name, None)
+            return None
+        tpl = self.templates.get(name)
+        if tpl is None or tpl.mtime != mtime: tpl = self.load(path)
+        return tpl
+
+    def get(self, kind, choice, default):
+        with stage("template"): return self.lookup(kind, choice, default)
+
+    def lookup(self, kind, choice, default):
+        name = f"{kind}_{(choice or default).lower()}"
+        if self.reload and re.fullmatch(r"\w+", name): tpl = self.refresh(name)
+        else: tpl = self.templates.get(name)
+        if tpl is None:
+            fallback = f"{kind}_{default}"
+            tpl = self.refresh(fallback) if self.reload else self.templates[fallback]
+        return tpl
+
+template_store = TemplateStore(APP_DIR)
+
+@functools.lru_cache(maxsize=32)
+def compile_template(source):
+    return CompiledTemplate(source)
+
+def render_with_placeholders(template, keys):
+    if isinstance(template, str): template = compile_template(template)
+    return template.render(keys)
+
+def cv_fields(data, updated=None):
     skills_clean = [s.strip() for s in data.get("skills", []) if s.strip()]
-    keys = {
+    return {
         "name": safe_get(data,"name"),
         "role": safe_get(data,"role"),
         "location": safe_get(data,"location"),
@@ -108,11 +451,28 @@ def render_cv_html(data, template_html):
         "website": safe_get(data,"website"),
         "summary": safe_get(data,"summary"),
         "skills": ", ".join(skills_clean),
-        "experience_html": render_experience(data.get("experience", [])),
-        "education_html": render_education(data.get("education", [])),
-        "updated": str(date.today()),
+        "updated": updated or str(date.today()),
     }
-    return render_with_placeholders(template_html, keys)
+
+def cv_keys(data, updated=None):
+    keys = cv_fields(data, updated)
+    keys["experience_html"] = render_experience(data.get("experience", []))
+    keys["education_html"] = render_education(data.get("education", []))
+    return keys
+
+def render_cv_html(data, template, updated=None):
+    with stage("render_html"): return render_with_placeholders(template, cv_keys(data, updated))
+
+def iter_cv_html(data, template, updated=None):
+    # The sections are rendered to pieces up front, so malformed entries fail
+    # before the response headers go out rather than truncating the body.
+    keys = cv_fields(data, updated)
+    with stage("render_sections"):
+        experience = list(iter_experience(data.get("experience", [])))
+        education = list(iter_education(data.get("education", [])))
+    keys["experience_html"] = lambda: iter(experience)
+    keys["education_html"] = lambda: iter(education)
+    return timed_iter("render_html", template.iter_render(keys))
 
 def build_cover_body(d):
     role = safe_get(d,"role")
@@ -128,8 +488,8 @@ def build_cover_body(d):
     p4 = "I would welcome the chance to discuss how I can contribute."
     return "</p><p>".join([x for x in [p1,p2,p3,p4] if x])
 
-def render_cover_html(data, template_html):
-    keys = {
+def cover_keys(data):
+    return {
         "name": safe_get(data,"name"),
         "role": safe_get(data,"role"),
         "location": safe_get(data,"location"),
@@ -141,13 +501,37 @@ def render_cover_html(data, template_html):
         "body": build_cover_body(data),
         "date": str(date.today()),
     }
-    return render_with_placeholders(template_html, keys)
+
+def render_cover_html(data, template):
+    with stage("render_html"): return render_with_placeholders(template, cover_keys(data))
+
+def iter_cover_html(data, template):
+    return timed_iter("render_html", template.iter_render(cover_keys(data)))
+
+def chunked(pieces, size=STREAM_CHUNK_KB * 1024):
+    # Coalesce the renderer's many small strings into socket-sized writes.
+    buf, n = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        n += len(piece)
+        if n >= size:
+            yield "".join(buf).encode("utf-8")
+            buf, n = [], 0
+    if buf: yield "".join(buf).encode("utf-8")
+
+def html_download(pieces, fname):
+    resp = Response(chunked(pieces), content_type="text/html; charset=utf-8")
+    resp.headers["Content-Disposition"] = f"attachment; filename={fname}"
+    return resp
 
 @app.route("/", methods=["GET"])
 def form():
     return render_template("form.html")
 
 def collect_data(form):
+    with stage("parse"): return parse_form(form)
+
+def parse_form(form):
     parse_json = lambda f: (json.loads(form.get(f,"")) if form.get(f,"").strip() else [])
     return {
         "name": form.get("name",""),
@@ -172,94 +556,909 @@ def safe_filename(name_fallback="file"):
     fname = _re.sub(r"[^A-Za-z0-9_-]+","_", raw).strip("_") or "file"
     return fname
 
+def process_tree(root=None):
+    children = {}
+    try: pids = [d for d in os.listdir("/proc") if d.isdigit()]
+    except OSError: return []
+    for d in pids:
+        try:
+            with open(f"/proc/{d}/stat") as f: ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError): continue
+        children.setdefault(ppid, []).append(int(d))
+    out, stack = [], list(children.get(root or os.getpid(), []))
+    while stack:
+        pid = stack.pop(); out.append(pid); stack.extend(children.get(pid, []))
+    return out
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1])
+    except (OSError, ValueError): pass
+    return 0
+
+def browser_rss_mb():
+    return sum(rss_kb(pid) for pid in process_tree()) // 1024
+
+class Timings:
+    def __init__(self, window=512):
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms):
+        with self.lock:
+            self.recent.append(ms)
+            self.count += 1
+            self.total += ms
+
+    def summary(self):
+        with self.lock: xs = sorted(self.recent); count, total = self.count, self.total
+        pick = lambda q: round(xs[min(len(xs) - 1, int(q * len(xs)))], 1) if xs else 0.0
+        return {"count": count, "avg_ms": round(total / count, 1) if count else 0.0,
+                "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(xs[-1], 1) if xs else 0.0}
+
+class RenderQueueFull(Exception): pass
+class RenderTimeout(Exception): pass
+
+# "QuickCV Sans" in the templates resolves to the bundled faces when printing
+# to PDF. They are served to Chromium from memory by the route handler, which
+# aborts every other request, so a render never waits on the network.
+PDF_FONT_ORIGIN = "https://fonts.quickcv.invalid/"
+PDF_FONT_FACES = (("400", "DejaVuSans.ttf"), ("700", "DejaVuSans-Bold.ttf"))
+PDF_READY_JS = "() => document.fonts.ready.then(() => true)"
+
+def load_pdf_fonts(root=PDF_FONT_DIR):
+    fonts, css = {}, []
+    for weight, name in PDF_FONT_FACES:
+        try: fonts[PDF_FONT_ORIGIN + name] = (root / name).read_bytes()
+        except OSError: continue
+        css.append(f'@font-face{{font-family:"QuickCV Sans";font-weight:{weight};src:url("{PDF_FONT_ORIGIN}{name}") format("truetype")}}')
+    return fonts, f"<style>{''.join(css)}</style>" if css else ""
+
+pdf_fonts, pdf_font_css = load_pdf_fonts()
+
+def inject_head(html, snippet):
+    i = html.find("</head>")
+    return html[:i] + snippet + html[i:] if i >= 0 else snippet + html
+
+def with_pdf_fonts(html):
+    return inject_head(html, pdf_font_css) if pdf_font_css else html
+
+def offline_route(route):
+    body = pdf_fonts.get(route.request.url)
+    if body is None: return route.abort()
+    route.fulfill(body=body, content_type="font/ttf", headers={"Access-Control-Allow-Origin": "*"})
+
+class BrowserSlot(threading.Thread):
+    # Sync Playwright objects are bound to the thread that created them, so
+    # each slot owns its own driver, browser, context and page.
+    def __init__(self, pool, n):
+        super().__init__(name=f"pdf-browser-{n}", daemon=True)
+        self.pool = pool
+        self.browser = self.context = self.page = None
+        self.renders = 0
+
+    def launch(self, p):
+        with stage("browser_launch"):
+            self.browser = p.chromium.launch(args=PDF_LAUNCH_ARGS)
+            self.context = self.browser.new_context(service_workers="block")
+            self.context.route("**/*", offline_route)
+            self.page = self.context.new_page()
+        self.renders = 0
+        self.pool.launches += 1
+
+    def close(self):
+        try:
+            if self.browser: self.browser.close()
+        except Exception: pass
+        self.browser = self.context = self.page = None
+
+    def healthy(self):
+        return self.browser is not None and self.browser.is_connected() and not self.page.is_closed()
+
+    def run(self):
+        p = err = None
+        try:
+            p = sync_playwright().start()
+            self.launch(p)
+        except Exception as e:
+            err = e
+        while True:
+            job = self.pool.next_job()
+            if job is None: break
+            fn, fut, enqueued, deadline = job
+            if not fut.set_running_or_notify_cancel(): continue
+            started = time.monotonic()
+            self.pool.wait_times.add((started - enqueued) * 1000)
+            record_stage("pdf_queue", started - enqueued)
+            if started > deadline:
+                self.pool.timed_out += 1
+                fut.set_exception(RenderTimeout()); continue
+            if p is None:
+                fut.set_exception(err); continue
+            self.pool.active += 1
+            try:
+                if not self.healthy():
+                    self.close(); self.launch(p)
+                fut.set_result(fn(self.page))
+            except Exception as e:
+                fut.set_exception(e)
+                self.close()
+                continue
+            finally:
+                self.pool.active -= 1
+                self.pool.render_times.add((time.monotonic() - started) * 1000)
+            self.renders += 1
+            self.pool.renders += 1
+            if self.pool.should_recycle(self):
+                self.pool.recycles += 1
+                self.close()
+                try: self.launch(p)
+                except Exception: pass
+        self.close()
+        if p: p.stop()
+
+class BrowserPool:
+    # The slots are the concurrency limit; jobs beyond them wait in a bounded
+    # queue and are shed with RenderQueueFull/RenderTimeout instead of piling up.
+    # Background jobs (pre-render, batch export) wait in a lane of their own
+    # that a free slot only takes from when no interactive job is waiting.
+    def __init__(self, size=PDF_POOL_SIZE, max_renders=PDF_POOL_MAX_RENDERS, max_rss_mb=PDF_POOL_MAX_RSS_MB,
+                 queue_max=PDF_QUEUE_MAX, queue_wait=PDF_QUEUE_WAIT, background_wait=PDF_BACKGROUND_WAIT):
+        self.size = max(1, size)
+        self.max_renders = max_renders
+        self.max_rss_mb = max_rss_mb
+        self.queue_max = max(1, queue_max)
+        self.queue_wait = queue_wait
+        # background jobs only get a slot when no interactive job is waiting,
+        # so under load they may queue far longer
+        self.background_wait = background_wait
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue(self.queue_max)
+        self.background = queue.Queue(self.queue_max)
+        self.ready = threading.Semaphore(0)
+        self.slots = []
+        self.pid = None
+        self.launches = 0
+        self.recycles = 0
+        self.renders = 0
+        self.active = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times = Timings()
+        self.render_times = Timings()
+
+    def start(self):
+        with self.lock:
+            # threads do not survive a fork, so a pool inherited from a
+            # preloading master is restarted inside each worker
+            if self.slots and self.pid == os.getpid(): return
+            self.pid = os.getpid()
+            self.jobs = queue.Queue(self.queue_max)
+            self.background = queue.Queue(self.queue_max)
+            self.ready = threading.Semaphore(0)
+            self.slots = [BrowserSlot(self, n) for n in range(self.size)]
+            for s in self.slots: s.start()
+
+    def submit(self, fn, wait=None, background=False):
+        self.start()
+        fut = Future()
+        now = time.monotonic()
+        if wait is None: wait = self.background_wait if background else self.queue_wait
+        try:
+            (self.background if background else self.jobs).put_nowait((fn, fut, now, now + wait))
+        except queue.Full:
+            if not background: self.rejected += 1
+            raise RenderQueueFull()
+        self.ready.release()
+        return fut
+
+    def next_job(self):
+        # one ready permit per queued job, so one of the queues has an item
+        self.ready.acquire()
+        while True:
+            for jobs in (self.jobs, self.background):
+                try: return jobs.get_nowait()
+                except queue.Empty: pass
+
+    def run(self, fn, timeout=PDF_RENDER_TIMEOUT):
+        fut = self.submit(fn)
+        try:
+            with stage("pdf"): return fut.result(self.queue_wait + timeout)
+        except FutureTimeout:
+            self.timed_out += 1
+            raise RenderTimeout()
+        finally:
+            fut.cancel()
+
+    def retry_after(self):
+        per_render = (self.render_times.summary()["avg_ms"] or 1000) / 1000
+        return max(1, math.ceil((self.jobs.qsize() + 1) * per_render / self.size))
+
+    def should_recycle(self, slot):
+        if self.max_renders and slot.renders >= self.max_renders: return True
+        return bool(self.max_rss_mb) and slot.renders % 10 == 0 and browser_rss_mb() > self.max_rss_mb
+
+    def shutdown(self):
+        with self.lock:
+            slots, self.slots = self.slots, []
+            if self.pid != os.getpid(): return
+            for _ in slots:
+                try: self.jobs.put(None, timeout=self.queue_wait)
+                except queue.Full: break
+                self.ready.release()
+        for s in slots: s.join(timeout=10)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "alive": sum(1 for s in self.slots if s.is_alive()),
+            "renders": self.renders,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "active": self.active,
+            "queue_depth": self.jobs.qsize(),
+            "queue_max": self.queue_max,
+            "background_depth": self.background.qsize(),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait": self.wait_times.summary(),
+            "render": self.render_times.summary(),
+        }
+
+pdf_pool = BrowserPool()
+atexit.register(pdf_pool.shutdown)
+
+class LRUCache:
+    def __init__(self, max_bytes, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        n = self.sizeof(value)
+        if n > self.max_bytes: return
+        with self.lock:
+            if key in self.items: self.size -= self.sizeof(self.items.pop(key))
+            self.items[key] = value
+            self.size += n
+            while self.size > self.max_bytes:
+                _, old = self.items.popitem(last=False)
+                self.size -= self.sizeof(old)
+
+    def stats(self):
+        return {"entries": len(self.items), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+class DiskCache:
+    # Files are shared by every worker; each worker tracks what it wrote and
+    # rescans the directory when it thinks the limit is exceeded. Recency is
+    # kept in atime so mtime, and with it send_file's validators, is stable.
+    def __init__(self, root, max_bytes, suffix=".pdf"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key):
+        return self.root / key[:2] / (key + self.suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            self.touch(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def lookup(self, key):
+        # like get() but returns the path, for handing to send_file
+        path = self.path(key)
+        try: self.touch(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def touch(self, path):
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+
+    def put(self, key, data):
+        path = self.path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self.lock:
+            if self.size is None: self.size = self.scan()[1]
+            else: self.size += len(data)
+            if self.size > self.max_bytes: self.evict()
+
+    def scan(self):
+        files, total = [], 0
+        for f in self.root.glob(f"*/*{self.suffix}"):
+            try: st = f.stat()
+            except OSError: continue
+            files.append((st.st_atime, st.st_size, f))
+            total += st.st_size
+        return files, total
+
+    def evict(self):
+        files, total = self.scan()
+        files.sort()
+        target = self.max_bytes * 0.9
+        for _, size, f in files:
+            if total <= target: break
+            try: f.unlink()
+            except OSError: continue
+            total -= size
+            self.evictions += 1
+        self.size = total
+
+    def stats(self):
+        return {"bytes": self.size, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class PdfCache:
+    def __init__(self, memory_mb=PDF_CACHE_MEMORY_MB, disk_mb=PDF_CACHE_DISK_MB, root=PDF_CACHE_DIR):
+        self.memory = LRUCache(memory_mb * 1024 * 1024)
+        self.disk = DiskCache(root, disk_mb * 1024 * 1024) if disk_mb > 0 else None
+        self.lock = threading.Lock()
+        self.inflight = {}
+
+    def get(self, key):
+        pdf = self.memory.get(key)
+        if pdf is None and self.disk:
+            pdf = self.disk.get(key)
+            if pdf is not None: self.memory.put(key, pdf)
+        return pdf
+
+    def put(self, key, pdf):
+        self.memory.put(key, pdf)
+        if self.disk: self.disk.put(key, pdf)
+
+    def get_or_render(self, key, render):
+        pdf = self.get(key)
+        if pdf is not None: return pdf
+        # identical concurrent requests (double clicks) share one render
+        with self.lock:
+            fut = self.inflight.get(key)
+            owner = fut is None
+            if owner: fut = self.inflight[key] = Future()
+        if not owner:
+            try: return fut.result(PDF_QUEUE_WAIT + PDF_RENDER_TIMEOUT)
+            except FutureTimeout: raise RenderTimeout()
+        try:
+            pdf = render()
+            self.put(key, pdf)
+            fut.set_result(pdf)
+            return pdf
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self.lock: self.inflight.pop(key, None)
+
+    def get_or_render_file(self, key, render):
+        # (path, None) when the PDF can be sent straight from the disk tier
+        # without reading it into memory, else (None, pdf bytes).
+        pdf = self.memory.get(key)
+        if pdf is None and self.disk:
+            path = self.disk.lookup(key)
+            if path: return path, None
+        return None, pdf if pdf is not None else self.get_or_render(key, render)
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats() if self.disk else None}
+
+pdf_cache = PdfCache()
+
+class ArtifactStore:
+    # Pages and PDFs pre-rendered for saved CVs, keyed by slug and the page's
+    # ETag, so a template or code change simply misses and renders live.
+    def __init__(self, root=ARTIFACT_DIR, disk_mb=ARTIFACT_DISK_MB):
+        self.stores = {kind: DiskCache(root, disk_mb * 1024 * 1024 // 2, suffix="." + kind) for kind in ("html", "pdf")}
+        self.stores["json"] = DiskCache(root, disk_mb * 1024 * 1024 // 64, suffix=".json")
+
+    def key(self, slug, tpl):
+        return f"{slug}.{shared_etag(tpl)}"
+
+    def get(self, kind, slug, tpl):
+        return self.stores[kind].get(self.key(slug, tpl))
+
+    def lookup(self, kind, slug, tpl):
+        return self.stores[kind].lookup(self.key(slug, tpl))
+
+    def put(self, kind, slug, tpl, data):
+        self.stores[kind].put(self.key(slug, tpl), data)
+
+    def put_pdf(self, slug, tpl, html, options, backend, pdf):
+        # the sidecar records what produced the PDF, so a renderer upgrade
+        # invalidates it as precisely as a template change does via the key
+        info = {"fingerprint": render_fingerprint(html, options, backend), "template": tpl.name,
+                "template_version": tpl.version, "renderer": backend.version,
+                "pdf_sha256": hashlib.sha256(pdf).hexdigest()}
+        self.put("pdf", slug, tpl, pdf)
+        self.put("json", slug, tpl, json.dumps(info, sort_keys=True).encode())
+
+    def pdf_path(self, slug, tpl, backend):
+        info = self.get("json", slug, tpl)
+        if info is None or json.loads(info).get("renderer") != backend.version: return None
+        return self.lookup("pdf", slug, tpl)
+
+    def stats(self):
+        return {kind: store.stats() for kind, store in self.stores.items()}
+
+artifacts = ArtifactStore()
+
+# Chromium and ReportLab stamp every PDF with the wall clock and a random
+# document ID. Both are rewritten in place at the same length, so the xref
+# offsets stay valid and identical input gives byte-identical output.
+PDF_DATE_RE = re.compile(rb"(/(?:CreationDate|ModDate)\s*\(D:)([^)]*)(\))")
+PDF_ID_RE = re.compile(rb"(/ID\s*\[\s*<)([0-9A-Fa-f]*)(>\s*<)([0-9A-Fa-f]*)(>)")
+PDF_EPOCH = b"20000101000000"
+
+def fixed_date(m):
+    digits = iter(PDF_EPOCH + b"0" * len(m.group(2)))
+    return m.group(1) + re.sub(rb"\d", lambda d: bytes([next(digits)]), m.group(2)) + m.group(3)
+
+def normalize_pdf(pdf):
+    pdf = PDF_DATE_RE.sub(fixed_date, pdf)
+    blank = lambda m: m.group(1) + b"0" * len(m.group(2)) + m.group(3) + b"0" * len(m.group(4)) + m.group(5)
+    pdf = PDF_ID_RE.sub(blank, pdf)
+    doc_id = hashlib.sha256(pdf).hexdigest().upper().encode() * 4
+    ids = lambda m: m.group(1) + doc_id[:len(m.group(2))] + m.group(3) + doc_id[:len(m.group(4))] + m.group(5)
+    return PDF_ID_RE.sub(ids, pdf)
+
+def package_version(name):
+    try: return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError: return "unknown"
+
+def render_fingerprint(html, options, backend):
+    # The HTML already carries the template's output; the renderer version
+    # covers the browser build, launch flags and bundled fonts.
+    raw = json.dumps({"options": options, "renderer": backend.version}, sort_keys=True) + "\0" + html
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def pdf_job(html, options):
+    def job(page):
+        with stage("pdf_set_content"):
+            # nothing external can load, so parsed DOM plus loaded fonts is ready
+            page.set_content(with_pdf_fonts(html), wait_until="domcontentloaded")
+            page.evaluate(PDF_READY_JS)
+        with stage("pdf_print"): return normalize_pdf(page.pdf(**options))
+    return job
+
+def submit_background(fn):
+    # the background lane is bounded too: a full one makes the caller wait
+    # rather than fail, and never takes a place in the interactive queue
+    while True:
+        try: return pdf_pool.submit(fn, background=True)
+        except RenderQueueFull: time.sleep(0.1)
+
+class ChromiumBackend:
+    name = "chromium"
+    # playwright pins the Chromium build it drives
+    version = "chromium/playwright-{}/{}".format(package_version("playwright"), hashlib.sha1(
+        json.dumps(PDF_LAUNCH_ARGS).encode() + b"".join(pdf_fonts[k] for k in sorted(pdf_fonts))).hexdigest()[:12])
+
+    def render(self, html, options):
+        return pdf_pool.run(pdf_job(html, options))
+
+    def render_background(self, html, options):
+        return submit_background(pdf_job(html, options)).result(pdf_pool.background_wait + PDF_RENDER_TIMEOUT)
+
+class XhtmlBackend:
+    # In-process HTML/CSS to PDF (pip install xhtml2pdf): no browser and tens
+    # of milliseconds per page, but only CSS 2-era layout, so it suits the
+    # plain templates. Page size and margins come from the same options.
+    name = "xhtml2pdf"
+    version = "xhtml2pdf/" + package_version("xhtml2pdf")
+
+    def page_css(self, options):
+        margin = options.get("margin", {})
+        sides = " ".join(margin.get(side, "0") for side in ("top", "right", "bottom", "left"))
+        return f"<style>@page{{size:{options.get('format', 'A4')};margin:{sides}}}</style>"
+
+    def render(self, html, options):
+        out = io.BytesIO()
+        with stage("pdf_inprocess"): result = pisa.CreatePDF(inject_head(html, self.page_css(options)), dest=out, encoding="utf-8")
+        if result.err: raise RuntimeError(f"xhtml2pdf reported {result.err} errors")
+        return normalize_pdf(out.getvalue())
+
+    render_background = render
+
+pdf_backends = {"chromium": ChromiumBackend()}
+if pisa: pdf_backends["xhtml2pdf"] = XhtmlBackend()
+template_backends = dict(item.strip().split("=", 1) for item in PDF_BACKENDS.split(",") if "=" in item)
+for _tpl_name, _backend in template_backends.items():
+    if _backend not in pdf_backends:
+        app.logger.warning("PDF_BACKENDS: %s is not available for %s; rendering it with chromium", _backend, _tpl_name)
+
+def pdf_backend_for(tpl):
+    # unknown or uninstalled backends fall back to Chromium (warned above)
+    return pdf_backends.get(template_backends.get(tpl.name), pdf_backends["chromium"])
+
+def render_pdf(html, options, backend=None):
+    backend = backend or pdf_backends["chromium"]
+    return pdf_cache.get_or_render(render_fingerprint(html, options, backend), lambda: backend.render(html, options))
+
+def render_pdfs(jobs, window=None, background=True):
+    # jobs are (name, html, options, backend) with html None for missing input
+    # or the exception that rendering it raised, and backend None for
+    # Chromium; yields (name, pdf bytes or exception) in completion order,
+    # keeping at most `window` Chromium renders in the pool at once.
+    # In-process backends render inline.
+    window = window or pdf_pool.size
+    submit = submit_background if background else pdf_pool.submit
+    timeout = (pdf_pool.background_wait if background else pdf_pool.queue_wait) + PDF_RENDER_TIMEOUT
+    jobs = iter(jobs)
+    pending = {}
+    try:
+        while True:
+            while len(pending) < window:
+                job = next(jobs, None)
+                if job is None: break
+                name, html, options, backend = job
+                if html is None:
+                    yield name, LookupError("not found"); continue
+                if isinstance(html, Exception):
+                    yield name, html; continue
+                backend = backend or pdf_backends["chromium"]
+                key = render_fingerprint(html, options, backend)
+                pdf = pdf_cache.get(key)
+                if pdf is not None:
+                    yield name, pdf; continue
+                if backend.name != "chromium":
+                    try: pdf = pdf_cache.get_or_render(key, lambda: backend.render(html, options))
+                    except Exception as e: pdf = e
+                    yield name, pdf; continue
+                pending[submit(pdf_job(html, options))] = (name, key)
+            if not pending: return
+            done, _ = wait_futures(pending, timeout, FIRST_COMPLETED)
+            if not done: raise RenderTimeout()
+            for fut in done:
+                name, key = pending.pop(fut)
+                try: pdf = fut.result()
+                except Exception as e:
+                    yield name, e; continue
+                pdf_cache.put(key, pdf)
+                yield name, pdf
+    finally:
+        for fut in pending: fut.cancel()
+
+class ZipSink:
+    # zipfile falls back to data descriptors on a sink without seek/tell, so
+    # each entry can be handed to the client as soon as it is written
+    def __init__(self): self.chunks = []
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+    def flush(self): pass
+    def drain(self):
+        out = b"".join(self.chunks)
+        self.chunks = []
+        return out
+
+def stream_zip(entries):
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
+
+def merge_pdfs(pdfs):
+    writer = PdfWriter()
+    for pdf in pdfs:
+        for page in PdfReader(io.BytesIO(pdf)).pages: writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+def batch_job(name, data, template_choice, updated=None):
+    # one malformed CV goes to errors.txt instead of ending the archive early
+    try:
+        tpl = template_store.get("cv", template_choice, "classic")
+        return name, render_cv_html(data, tpl, updated), PDF_CV_OPTIONS, pdf_backend_for(tpl)
+    except Exception as e: return name, e, None, None
+
+def batch_jobs(slugs=(), cvs=()):
+    for slug in slugs:
+        shared = load_shared(str(slug))
+        if not shared:
+            yield f"{safe_filename(str(slug))}.pdf", None, None, None; continue
+        data, template_choice, created_at = shared
+        yield batch_job(f"{slug}.pdf", data, template_choice, created_at[:10])
+    for n, data in enumerate(cvs, 1):
+        if not isinstance(data, dict):
+            yield f"{n:04d}.pdf", None, None, None; continue
+        yield batch_job(f"{n:04d}_{safe_filename(safe_get(data,'name'))}.pdf", data, data.get("template"))
+
+def batch_zip_entries(jobs):
+    errors = []
+    for name, result in render_pdfs(jobs):
+        if isinstance(result, Exception): errors.append(f"{name}: {type(result).__name__} {result}")
+        else: yield name, result
+    if errors: yield "errors.txt", "\n".join(errors) + "\n"
+
+@app.errorhandler(RenderQueueFull)
+def render_queue_full(e):
+    resp = make_response("PDF renderer is busy, please retry shortly", 429)
+    resp.headers["Retry-After"] = str(pdf_pool.retry_after())
+    return resp
+
+@app.errorhandler(RenderTimeout)
+def render_timeout(e):
+    resp = make_response("PDF rendering timed out, please retry", 503)
+    resp.headers["Retry-After"] = str(pdf_pool.retry_after())
+    return resp
+
+def pdf_response(pdf, fname, disposition="attachment"):
+    # A Path goes out through send_file: sendfile() under Gunicorn, with
+    # conditional and Range requests so interrupted downloads can resume.
+    if isinstance(pdf, Path):
+        return send_file(pdf, mimetype="application/pdf", as_attachment=disposition == "attachment", download_name=fname)
+    resp = Response(pdf, mimetype="application/pdf")
+    resp.headers["Content-Disposition"] = f"{disposition}; filename={fname}"
+    resp.add_etag()
+    return resp.make_conditional(request, accept_ranges=True)
+
+def send_pdf(html, options, fname, disposition="attachment", backend=None):
+    backend = backend or pdf_backends["chromium"]
+    key = render_fingerprint(html, options, backend)
+    render = lambda: backend.render(html, options)
+    path, pdf = pdf_cache.get_or_render_file(key, render)
+    if path:
+        try: return pdf_response(path, fname, disposition)
+        except OSError: pdf = pdf_cache.get_or_render(key, render)  # evicted since the lookup
+    return pdf_response(pdf, fname, disposition)
+
 @app.route("/generate_pdf", methods=["POST"])
 def generate_pdf_download():
     data = collect_data(request.form)
-    template_choice = (data.get("template","classic") or "classic").lower()
-    template_file = APP_DIR / f"cv_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cv_classic.html"
-    html = render_cv_html(data, template_file.read_text(encoding="utf-8"))
+    tpl = template_store.get("cv", data.get("template"), "classic")
+    html = render_cv_html(data, tpl)
     fname = safe_filename(data.get("name")) + ".pdf"
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html, wait_until="load")
-        pdf_bytes = page.pdf(format="A4", print_background=True, margin={"top":"12mm","bottom":"12mm","left":"12mm","right":"12mm"})
-        browser.close()
-    resp = make_response(pdf_bytes)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = f"attachment; filename={fname}"
-    return resp
+    return send_pdf(html, PDF_CV_OPTIONS, fname, backend=pdf_backend_for(tpl))
 
 @app.route("/generate", methods=["POST"])
 def generate_html_download():
     data = collect_data(request.form)
-    template_choice = (data.get("template","classic") or "classic").lower()
-    template_file = APP_DIR / f"cv_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cv_classic.html"
-    html = render_cv_html(data, template_file.read_text(encoding="utf-8"))
     fname = safe_filename(data.get("name")) + ".html"
-    resp = make_response(html)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    resp.headers["Content-Disposition"] = f"attachment; filename={fname}"
-    return resp
+    return html_download(iter_cv_html(data, template_store.get("cv", data.get("template"), "classic")), fname)
 
 @app.route("/cover_pdf", methods=["POST"])
 def cover_pdf_download():
     data = collect_data(request.form)
-    template_choice = (data.get("template","modern") or "modern").lower()
-    template_file = APP_DIR / f"cover_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cover_modern.html"
-    html = render_cover_html(data, template_file.read_text(encoding="utf-8"))
+    tpl = template_store.get("cover", data.get("template"), "modern")
+    html = render_cover_html(data, tpl)
     fname = safe_filename("Cover_Letter_" + safe_get(data,"name")) + ".pdf"
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html, wait_until="load")
-        pdf_bytes = page.pdf(format="A4", print_background=True, margin={"top":"18mm","bottom":"18mm","left":"18mm","right":"18mm"})
-        browser.close()
-    resp = make_response(pdf_bytes)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = f"attachment; filename={fname}"
-    return resp
+    return send_pdf(html, PDF_COVER_OPTIONS, fname, backend=pdf_backend_for(tpl))
 
 @app.route("/cover_html", methods=["POST"])
 def cover_html_download():
     data = collect_data(request.form)
-    template_choice = (data.get("template","modern") or "modern").lower()
-    template_file = APP_DIR / f"cover_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cover_modern.html"
-    html = render_cover_html(data, template_file.read_text(encoding="utf-8"))
     fname = safe_filename("Cover_Letter_" + safe_get(data,"name")) + ".html"
-    resp = make_response(html)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    resp.headers["Content-Disposition"] = f"attachment; filename={fname}"
+    return html_download(iter_cover_html(data, template_store.get("cover", data.get("template"), "modern")), fname)
+
+@app.route("/application_pack", methods=["POST"])
+def application_pack_download():
+    data = collect_data(request.form)
+    cv_name = safe_filename(data.get("name")) + ".pdf"
+    cover_name = safe_filename("Cover_Letter_" + safe_get(data,"name")) + ".pdf"
+    cv_tpl = template_store.get("cv", data.get("template"), "classic")
+    cover_tpl = template_store.get("cover", data.get("template"), "modern")
+    jobs = [
+        (cv_name, render_cv_html(data, cv_tpl), PDF_CV_OPTIONS, pdf_backend_for(cv_tpl)),
+        (cover_name, render_cover_html(data, cover_tpl), PDF_COVER_OPTIONS, pdf_backend_for(cover_tpl)),
+    ]
+    pdfs = dict(render_pdfs(jobs, window=len(jobs), background=False))
+    for result in pdfs.values():
+        if isinstance(result, Exception): raise result
+    if request.form.get("pack_format") == "pdf" and PdfWriter is not None:
+        return pdf_response(merge_pdfs([pdfs[cv_name], pdfs[cover_name]]), safe_filename(data.get("name")) + "_Application.pdf")
+    resp = Response(stream_zip([(cv_name, pdfs[cv_name]), (cover_name, pdfs[cover_name])]), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = f"attachment; filename={safe_filename(data.get('name'))}_Application.zip"
     return resp
 
+def insert_shared(conn, slug, record):
+    with stage("db"): conn.execute(SQL_INSERT_SHARED, (slug, record["data_json"], record["schema"], record["template"], record["created_at"]))
+    return slug
+
+class SaveWriter:
+    # Group commit: request threads queue their record and wait while one
+    # writer thread inserts everything that arrived within SAVE_BATCH_MS in
+    # a single transaction, so a burst of saves shares one fsync.
+    def __init__(self, batch_ms=SAVE_BATCH_MS, batch_max=SAVE_BATCH_MAX):
+        self.batch_s = batch_ms / 1000
+        self.batch_max = max(1, batch_max)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.pid = None
+        self.batches = 0
+        self.saves = 0
+        self.max_batch = 0
+        self.failed = 0
+        self.wait_times = Timings()
+        self.commit_times = Timings()
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.pid == os.getpid(): return
+            self.pid = os.getpid()
+            self.jobs = queue.Queue()
+            self.thread = threading.Thread(target=self.loop, name="save-writer", daemon=True)
+            self.thread.start()
+
+    def submit(self, record, timeout=SAVE_TIMEOUT):
+        self.start()
+        fut = Future()
+        self.jobs.put((record, fut, time.monotonic()))
+        return fut.result(timeout)
+
+    def loop(self):
+        while True:
+            item = self.jobs.get()
+            if item is None: return
+            batch, deadline = [item], time.monotonic() + self.batch_s
+            while len(batch) < self.batch_max:
+                try: item = self.jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty: break
+                if item is None:
+                    self.jobs.put(None)
+                    break
+                batch.append(item)
+            self.commit(batch)
+
+    def commit(self, batch):
+        started = time.monotonic()
+        for _, _, enqueued in batch: self.wait_times.add((started - enqueued) * 1000)
+        try:
+            slugs = [slug_allocator.next() for _ in batch]
+            with stage("db_commit"), db() as conn:
+                for slug, (record, _, _) in zip(slugs, batch): insert_shared(conn, slug, record)
+        except Exception as e:
+            self.failed += len(batch)
+            for _, fut, _ in batch: fut.set_exception(e)
+            return
+        self.commit_times.add((time.monotonic() - started) * 1000)
+        self.batches += 1
+        self.saves += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        for slug, (_, fut, _) in zip(slugs, batch): fut.set_result(slug)
+
+    def shutdown(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is None or self.pid != os.getpid(): return
+            self.jobs.put(None)
+        thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            "batch_ms": self.batch_s * 1000,
+            "batches": self.batches,
+            "saves": self.saves,
+            "avg_batch": round(self.saves / self.batches, 1) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "failed": self.failed,
+            "queue_depth": self.jobs.qsize(),
+            "wait": self.wait_times.summary(),
+            "commit": self.commit_times.summary(),
+        }
+
+save_writer = SaveWriter() if SAVE_BATCH_MS > 0 else None
+if save_writer: atexit.register(save_writer.shutdown)
+
+class Prerenderer:
+    # Renders a new share's page and PDF into the artifact store so the first
+    # visitor doesn't wait for a cold Chromium render. Saves never block on
+    # it: with the queue full the job is dropped and renders live on first view.
+    def __init__(self, queue_max=PRERENDER_QUEUE_MAX):
+        self.queue_max = max(1, queue_max)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue(self.queue_max)
+        self.thread = None
+        self.pid = None
+        self.done = 0
+        self.dropped = 0
+        self.failed = 0
+        self.times = Timings()
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.pid == os.getpid(): return
+            self.pid = os.getpid()
+            self.jobs = queue.Queue(self.queue_max)
+            self.thread = threading.Thread(target=self.loop, name="prerender", daemon=True)
+            self.thread.start()
+
+    def submit(self, slug, data, template_choice, created_at):
+        self.start()
+        try: self.jobs.put_nowait((slug, data, template_choice, created_at))
+        except queue.Full: self.dropped += 1
+
+    def loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None: return
+            started = time.monotonic()
+            try:
+                self.render(*job)
+                self.done += 1
+            except Exception:
+                self.failed += 1
+                app.logger.exception("Pre-render of %s failed", job[0])
+            self.times.add((time.monotonic() - started) * 1000)
+
+    def render(self, slug, data, template_choice, created_at):
+        tpl = template_store.get("cv", template_choice, "classic")
+        html = render_cv_html(data, tpl, created_at[:10])
+        artifacts.put("html", slug, tpl, html.encode("utf-8"))
+        backend = pdf_backend_for(tpl)
+        pdf = backend.render_background(html, PDF_CV_OPTIONS)
+        artifacts.put_pdf(slug, tpl, html, PDF_CV_OPTIONS, backend, pdf)
+
+    def shutdown(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is None or self.pid != os.getpid(): return
+            try: self.jobs.put_nowait(None)
+            except queue.Full: return
+        thread.join(timeout=10)
+
+    def stats(self):
+        return {"done": self.done, "dropped": self.dropped, "failed": self.failed,
+                "queue_depth": self.jobs.qsize(), "queue_max": self.queue_max, "render": self.times.summary()}
+
+prerenderer = Prerenderer() if PRERENDER else None
+if prerenderer: atexit.register(prerenderer.shutdown)
+
 @app.route("/save", methods=["POST"])
 def save_share():
     data = collect_data(request.form)
+    schema, blob = encode_cv(data)
     record = {
-        "data_json": json.dumps(data),
+        "data_json": blob,
+        "schema": schema,
         "template": (data.get("template","classic") or "classic").lower(),
         "created_at": datetime.utcnow().isoformat(timespec="seconds")+"Z"
     }
-    slug = gen_slug()
-    conn = db()
-    tries = 0
-    while True:
-        try:
-            conn.execute("INSERT INTO cv_store(slug, data_json, template, created_at) VALUES(?,?,?,?)",
-                         (slug, record["data_json"], record["template"], record["created_at"]))
-            conn.commit()
-            break
-        except sqlite3.IntegrityError:
-            slug = gen_slug()
-            tries += 1
-            if tries > 5:
-                conn.close()
-                return make_response("Error generating link", 500)
-    conn.close()
+    if save_writer:
+        try: slug = save_writer.submit(record)
+        except FutureTimeout: return make_response("Saving is busy, please retry", 503, {"Retry-After": "1"})
+    else:
+        slug = slug_allocator.next()
+        with stage("db_commit"), db() as conn: insert_shared(conn, slug, record)
+    if prerenderer: prerenderer.submit(slug, data, record["template"], record["created_at"])
     link_html = f"/v/{slug}"
     link_pdf = f"/p/{slug}.pdf"
     html = f"""
@@ -299,103 +1498,374 @@ a.btn{{text-decoration:none}}
     resp.headers["Content-Type"] = "text/html; charset=utf-8"
     return resp
 
+def shared_meta(slug):
+    with stage("db"): return db().execute(SQL_SHARED_META, (slug,)).fetchone()
+
+def load_shared(slug):
+    with stage("db"): row = db().execute(SQL_SHARED_BY_SLUG, (slug,)).fetchone()
+    if not row: return None
+    with stage("decode"): data = decode_cv(row["schema"], row["data_json"])
+    if row["schema"] != STORE_SCHEMA: migrate_row(slug, row["schema"], data)
+    return data, row["template"], row["created_at"]
+
+def shared_etag(tpl):
+    return hashlib.sha1(f"{tpl.name}:{tpl.version}:{RENDER_VERSION}".encode()).hexdigest()[:20]
+
+class SharedPage:
+    __slots__ = ("body", "template", "etag", "last_modified")
+    def __init__(self, body, template, last_modified):
+        self.body = body
+        self.template = template
+        self.etag = shared_etag(template)
+        self.last_modified = last_modified
+    def __len__(self): return len(self.body)
+
+shared_html_cache = LRUCache(SHARE_CACHE_MB * 1024 * 1024)
+
+def shared_response(page, body=None):
+    resp = Response(page.body if body is None else body, content_type="text/html; charset=utf-8")
+    # Otherwise make_conditional buffers a streamed body to set Content-Length.
+    if body is not None: resp.automatically_set_content_length = False
+    resp.headers["Cache-Control"] = f"public, max-age={SHARE_MAX_AGE}"
+    resp.set_etag(page.etag)
+    resp.last_modified = page.last_modified
+    return resp.make_conditional(request)
+
+def stream_shared(slug, page, pieces):
+    # Streams the first render of a shared page and caches it once complete.
+    chunks = []
+    for chunk in chunked(pieces):
+        chunks.append(chunk)
+        yield chunk
+    page.body = b"".join(chunks)
+    shared_html_cache.put(slug, page)
+
 @app.route("/v/<slug>", methods=["GET"])
 def view_shared(slug):
-    conn = db()
-    row = conn.execute("SELECT data_json, template FROM cv_store WHERE slug=?", (slug,)).fetchone()
-    conn.close()
-    if not row:
-        return make_response("Not found", 404)
-    data = json.loads(row["data_json"])
-    template_choice = (row["template"] or "classic").lower()
-    template_file = APP_DIR / f"cv_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cv_classic.html"
-    html = render_cv_html(data, template_file.read_text(encoding="utf-8"))
-    resp = make_response(html)
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    return resp
+    # A saved CV never changes, so the page only depends on its template and
+    # this code. Once the meta row names the template, a matching validator
+    # is answered without loading the CV.
+    page = shared_html_cache.get(slug)
+    if page is not None and template_store.templates.get(page.template.name) is not page.template: page = None
+    if page is None:
+        meta = shared_meta(slug)
+        if not meta:
+            return make_response("Not found", 404)
+        tpl = template_store.get("cv", meta["template"], "classic")
+        etag = shared_etag(tpl)
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = f"public, max-age={SHARE_MAX_AGE}"
+            return resp
+        modified = max(datetime.fromisoformat(meta["created_at"].rstrip("Z")), datetime.utcfromtimestamp((tpl.mtime or 0) / 1e9))
+        page = SharedPage(artifacts.get("html", slug, tpl), tpl, modified)
+        if page.body is None:
+            shared = load_shared(slug)
+            if not shared:
+                return make_response("Not found", 404)
+            data, _, created_at = shared
+            page.body = b""
+            return shared_response(page, stream_shared(slug, page, iter_cv_html(data, tpl, created_at[:10])))
+        shared_html_cache.put(slug, page)
+    return shared_response(page)
 
 @app.route("/p/<slug>.pdf", methods=["GET"])
 def view_shared_pdf(slug):
-    conn = db()
-    row = conn.execute("SELECT data_json, template FROM cv_store WHERE slug=?", (slug,)).fetchone()
-    conn.close()
-    if not row:
+    meta = shared_meta(slug)
+    if not meta:
+        return make_response("Not found", 404)
+    tpl = template_store.get("cv", meta["template"], "classic")
+    fname = f"{safe_filename('CV')}.pdf"
+    backend = pdf_backend_for(tpl)
+    path = artifacts.pdf_path(slug, tpl, backend)
+    if path:
+        try: return pdf_response(path, fname, "inline")
+        except OSError: pass  # evicted since the lookup
+    shared = load_shared(slug)
+    if not shared:
         return make_response("Not found", 404)
-    data = json.loads(row["data_json"])
-    template_choice = (row["template"] or "classic").lower()
-    template_file = APP_DIR / f"cv_{template_choice}.html"
-    if not template_file.exists(): template_file = APP_DIR / "cv_classic.html"
-    html = render_cv_html(data, template_file.read_text(encoding="utf-8"))
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html, wait_until="load")
-        pdf_bytes = page.pdf(format="A4", print_background=True, margin={"top":"12mm","bottom":"12mm","left":"12mm","right":"12mm"})
-        browser.close()
-    resp = make_response(pdf_bytes)
-    resp.headers["Content-Type"] = "application/pdf"
-    resp.headers["Content-Disposition"] = f"inline; filename={safe_filename('CV')}.pdf"
+    data, _, created_at = shared
+    html = render_cv_html(data, tpl, created_at[:10])
+    pdf_bytes = render_pdf(html, PDF_CV_OPTIONS, backend)
+    artifacts.put_pdf(slug, tpl, html, PDF_CV_OPTIONS, backend, pdf_bytes)
+    return pdf_response(pdf_bytes, fname, "inline")
+
+def require_admin():
+    # the admin routes stay switched off until ADMIN_TOKEN is configured
+    if not ADMIN_TOKEN: return make_response("Not found", 404)
+    if not secrets.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return make_response("Forbidden", 403)
+    return None
+
+@app.route("/batch_pdf", methods=["POST"])
+def batch_pdf_download():
+    denied = require_admin()
+    if denied: return denied
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list): payload = {"cvs": payload}
+    if not isinstance(payload, dict): return make_response("Expected a JSON object or array", 400)
+    slugs = payload.get("slugs") or []
+    cvs = payload.get("cvs") or []
+    if not isinstance(slugs, list) or not isinstance(cvs, list): return make_response("slugs and cvs must be arrays", 400)
+    if len(slugs) + len(cvs) > BATCH_MAX_ITEMS: return make_response(f"At most {BATCH_MAX_ITEMS} items per batch", 413)
+    resp = Response(stream_with_context(stream_zip(batch_zip_entries(batch_jobs(slugs, cvs)))), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = "attachment; filename=cvs.zip"
     return resp
 
-def analyze(data):
-    score = 0
-    tips = []
-    name_ok = bool(data.get("name"))
-    email_ok = bool(re.search(r".+@.+\..+", data.get("email","")))
-    phone_ok = bool(re.search(r"\d", data.get("phone","")))
-    score += 5 if name_ok else 0
-    score += 5 if email_ok else 0
-    score += 5 if phone_ok else 0
-    s = (data.get("summary","") or "").strip()
-    sl = len(s)
-    if 120 <= sl <= 400: score += 15
-    elif 60 <= sl < 120 or 400 < sl <= 700: score += 8; tips.append("Tighten your profile summary to about 2–4 lines.")
-    else: tips.append("Write a concise 2–4 line profile summary.")
-    skills = [x for x in data.get("skills",[]) if x]
-    sc = len(skills)
-    if sc >= 8: score += 12
-    elif 5 <= sc < 8: score += 8
-    elif 1 <= sc < 5: score += 4; tips.append("Add more relevant skills (aim for 8–12).")
-    else: tips.append("List key skills to quickly show your strengths.")
+@app.cli.command("export-pdfs")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--slug", "slugs", multiple=True, help="Slug of a saved CV; repeatable.")
+@click.option("--all", "all_saved", is_flag=True, help="Export every saved CV.")
+@click.option("--json", "json_file", type=click.File("r"), help="JSON array of CV payloads.")
+def export_pdfs_command(output, slugs, all_saved, json_file):
+    slugs = list(slugs)
+    if all_saved:
+        slugs += [r["slug"] for r in db().execute("SELECT slug FROM cv_store ORDER BY id")]
+    cvs = json.load(json_file) if json_file else []
+    with open(output, "wb") as f:
+        for chunk in stream_zip(batch_zip_entries(batch_jobs(slugs, cvs))): f.write(chunk)
+    pdf_pool.shutdown()
+    click.echo(f"Wrote {output}")
+
+EMAIL_RE = re.compile(r".+@.+\..+")
+DIGIT_RE = re.compile(r"\d")
+DATE_RE = re.compile(r"^\d{4}(-\d{2})?$")
+WORD_RUN_RE = re.compile(r"\w*")
+ACTION_VERBS = frozenset(["led","built","created","designed","implemented","launched","increased","reduced","improved","optimized","managed","developed","delivered","owned","drove","resolved","automated","collaborated","analyzed","architected"])
+ACTION_RE = re.compile(r"(?i)(" + "|".join(sorted(ACTION_VERBS)) + r")\b")
+
+def bullet_stats(text):
+    # One split gives the word count and the first token. A bullet starts with
+    # an action verb when that token's leading word run is one; non-ASCII
+    # tokens go through the regex so Unicode case folding matches re.IGNORECASE.
+    words = text.split()
+    if not words: return 0, False
+    first = words[0]
+    if first.isascii(): return len(words), WORD_RUN_RE.match(first).group().lower() in ACTION_VERBS
+    return len(words), ACTION_RE.match(first) is not None
+
+def contact_features(data):
+    return {"name_ok": bool(data.get("name")), "email_ok": bool(EMAIL_RE.search(data.get("email",""))),
+            "phone_ok": bool(DIGIT_RE.search(data.get("phone",""))), "website_ok": bool(data.get("website","").strip())}
+
+def summary_features(data):
+    return {"summary_len": len((data.get("summary","") or "").strip())}
+
+def skills_features(data):
+    return {"skills": len([x for x in data.get("skills",[]) if x])}
+
+def experience_features(data):
     exp = data.get("experience",[]) or []
-    if len(exp) >= 1: score += 15
-    else: tips.append("Add at least one experience entry, even volunteer or projects.")
-    bullets_total = 0
-    bullet_words_good = 0
-    action_hits = 0
-    action_verbs = set(["led","built","created","designed","implemented","launched","increased","reduced","improved","optimized","managed","developed","delivered","owned","drove","resolved","automated","collaborated","analyzed","architected"])
-    date_ok = 0
+    bullets = concise = action_hits = date_hits = 0
     for e in exp:
         hs = e.get("highlights",[]) or []
-        bullets_total += len(hs)
+        bullets += len(hs)
         for h in hs:
-            words = len(h.split())
-            if 8 <= words <= 24: bullet_words_good += 1
-            if re.match(r"(?i)("+ "|".join(action_verbs) + r")\b", h.strip()): action_hits += 1
+            words, verb = bullet_stats(h)
+            if 8 <= words <= 24: concise += 1
+            if verb: action_hits += 1
         if e.get("start") or e.get("end"):
-            if re.match(r"^\d{4}(-\d{2})?$", (e.get("start") or "")) or re.match(r"^\d{4}$", (e.get("start") or "")): date_ok += 1
-            if re.match(r"^\d{4}(-\d{2})?$", (e.get("end") or "")) or re.match(r"^\d{4}$", (e.get("end") or "")): date_ok += 1
-    if bullets_total >= 4: score += 8
-    elif 1 <= bullets_total < 4: score += 4; tips.append("Add more bullet achievements under experience.")
-    else: tips.append("Add bullet points with achievements under experience.")
-    if bullets_total > 0:
-        ratio = bullet_words_good / max(1, bullets_total)
-        if ratio >= 0.6: score += 8
-        else: tips.append("Keep bullet points concise (8–24 words).")
-    if action_hits >= max(1, bullets_total//2): score += 8
-    else: tips.append("Start bullets with strong verbs (Built, Led, Improved).")
-    if date_ok >= max(1, len(exp)): score += 4
-    else: tips.append("Use consistent dates like 2023-06 or 2023.")
-    edu = data.get("education",[]) or []
-    if len(edu) >= 1: score += 8
-    else: tips.append("Add your education or courses.")
-    website = data.get("website","").strip()
-    if website: score += 4
-    else: tips.append("Add a portfolio or LinkedIn URL.")
+            if DATE_RE.match(e.get("start") or ""): date_hits += 1
+            if DATE_RE.match(e.get("end") or ""): date_hits += 1
+    return {"experience": len(exp), "bullets": bullets,
+            "bullet_ratio": concise / max(1, bullets) if bullets else None,
+            "action_ok": action_hits >= max(1, bullets // 2),
+            "dates_ok": date_hits >= max(1, len(exp))}
+
+def education_features(data):
+    return {"education": len(data.get("education",[]) or [])}
+
+# Each section's features depend only on the listed form fields.
+SECTIONS = [
+    ("contact", ("name", "email", "phone", "website"), contact_features),
+    ("summary", ("summary",), summary_features),
+    ("skills", ("skills",), skills_features),
+    ("experience", ("experience",), experience_features),
+    ("education", ("education",), education_features),
+]
+
+ScoreRule = namedtuple("ScoreRule", "feature bands miss_tip")
+
+# Rules are applied in order and their tips keep that order. A band is
+# (low, high, points, tip) with inclusive bounds, None meaning unbounded; the
+# first matching band wins and miss_tip applies when none does. A rule whose
+# feature is None (e.g. bullet_ratio without bullets) is skipped.
+SCORING_RULES = [
+    ScoreRule("name_ok", [(1, 1, 5, None)], None),
+    ScoreRule("email_ok", [(1, 1, 5, None)], None),
+    ScoreRule("phone_ok", [(1, 1, 5, None)], None),
+    ScoreRule("summary_len", [(120, 400, 15, None), (60, 119, 8, "Tighten your profile summary to about 2–4 lines."),
+                              (401, 700, 8, "Tighten your profile summary to about 2–4 lines.")],
+              "Write a concise 2–4 line profile summary."),
+    ScoreRule("skills", [(8, None, 12, None), (5, 7, 8, None), (1, 4, 4, "Add more relevant skills (aim for 8–12).")],
+              "List key skills to quickly show your strengths."),
+    ScoreRule("experience", [(1, None, 15, None)], "Add at least one experience entry, even volunteer or projects."),
+    ScoreRule("bullets", [(4, None, 8, None), (1, 3, 4, "Add more bullet achievements under experience.")],
+              "Add bullet points with achievements under experience."),
+    ScoreRule("bullet_ratio", [(0.6, None, 8, None)], "Keep bullet points concise (8–24 words)."),
+    ScoreRule("action_ok", [(1, 1, 8, None)], "Start bullets with strong verbs (Built, Led, Improved)."),
+    ScoreRule("dates_ok", [(1, 1, 4, None)], "Use consistent dates like 2023-06 or 2023."),
+    ScoreRule("education", [(1, None, 8, None)], "Add your education or courses."),
+    ScoreRule("website_ok", [(1, 1, 4, None)], "Add a portfolio or LinkedIn URL."),
+]
+
+RATINGS = [(85, "Outstanding"), (70, "Strong"), (55, "OK")]
+
+def cv_features(data):
+    features = {}
+    for _, _, extract in SECTIONS: features.update(extract(data))
+    return features
+
+def rating_for(score):
+    return next((label for floor, label in RATINGS if score >= floor), "Needs improvement")
+
+def score_features(features, rules=SCORING_RULES):
+    score, tips = 0, []
+    for rule in rules:
+        value = features[rule.feature]
+        if value is None: continue
+        for low, high, points, tip in rule.bands:
+            if (low is None or value >= low) and (high is None or value <= high):
+                score += points
+                if tip: tips.append(tip)
+                break
+        else:
+            if rule.miss_tip: tips.append(rule.miss_tip)
     score = max(0, min(100, score))
-    rating = "Outstanding" if score >= 85 else ("Strong" if score >= 70 else ("OK" if score >= 55 else "Needs improvement"))
-    return score, rating, tips
+    return score, rating_for(score), tips
+
+def analyze(data):
+    return score_features(cv_features(data))
+
+def score_batch(cvs, rules=SCORING_RULES):
+    # score_features() evaluated column-wise over the whole batch. This is a
+    # batch API, not a speedup: feature extraction is still per CV, which
+    # dominates. Returns analyze()-style (score, rating, tips) tuples, or
+    # None for entries analyze() could not have scored.
+    rows = []
+    for data in cvs:
+        try: rows.append(cv_features(data))
+        except (AttributeError, TypeError): rows.append(None)
+    valid = [r for r in rows if r is not None]
+    results = iter(score_feature_columns(valid, rules) if valid else [])
+    return [next(results) if r is not None else None for r in rows]
+
+def score_feature_columns(rows, rules=SCORING_RULES):
+    # imported here so web workers that never score a batch don't pay for numpy
+    import numpy as np
+    score = np.zeros(len(rows), dtype=np.int64)
+    tip_masks, tip_texts = [], []
+    for rule in rules:
+        col = np.array([np.nan if r[rule.feature] is None else float(r[rule.feature]) for r in rows])
+        pending = ~np.isnan(col)
+        for low, high, points, tip in rule.bands:
+            hit = pending.copy()
+            if low is not None: hit &= col >= low
+            if high is not None: hit &= col <= high
+            score += np.where(hit, points, 0)
+            if tip: tip_masks.append(hit); tip_texts.append(tip)
+            pending &= ~hit
+        if rule.miss_tip: tip_masks.append(pending); tip_texts.append(rule.miss_tip)
+    score = np.clip(score, 0, 100)
+    tip_masks = np.stack(tip_masks, axis=1) if tip_masks else np.zeros((len(rows), 0), dtype=bool)
+    return [(int(score[i]), rating_for(score[i]), [tip_texts[j] for j in np.flatnonzero(tip_masks[i])])
+            for i in range(len(rows))]
+
+def api_payload():
+    # The live form APIs take {"cv": {...}, ...} with the fields already
+    # parsed (skills may still be a comma string), or a plain form post.
+    payload = request.get_json(silent=True)
+    if payload is None: payload = {"cv": collect_data(request.form), "template": request.form.get("template")}
+    cv = payload.get("cv") if isinstance(payload, dict) else None
+    if not isinstance(cv, dict): return {}, None
+    if isinstance(cv.get("skills"), str): cv["skills"] = [x.strip() for x in cv["skills"].split(",") if x.strip()]
+    return payload, cv
+
+section_feature_cache = LRUCache(SCORE_CACHE_ENTRIES, sizeof=lambda v: 1)
+
+def section_hash(name, fields, data):
+    raw = json.dumps([name] + [data.get(f) for f in fields], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def section_features(name, fields, extract, data):
+    h = section_hash(name, fields, data)
+    part = section_feature_cache.get((name, h))
+    if part is None:
+        part = extract(data)
+        section_feature_cache.put((name, h), part)
+    return h, part
+
+@app.route("/api/score", methods=["POST"])
+def score_api():
+    # Live scoring for the form. The JSON body is {"cv": {...}, "sections":
+    # {name: hash}}: sections whose fields are in "cv" are (re)scored, the
+    # others are taken from cached features by the hash returned earlier.
+    # 409 lists the hashes this worker no longer has, so the client resends.
+    payload, cv = api_payload()
+    known = payload.get("sections") or {} if cv is not None else None
+    if not isinstance(known, dict): return make_response("Expected {\"cv\": {...}, \"sections\": {...}}", 400)
+    features, hashes, missing = {}, {}, []
+    for name, fields, extract in SECTIONS:
+        if not any(f in cv for f in fields) and name in known:
+            if not isinstance(known[name], str): return make_response(f"Invalid {name} section hash", 400)
+            # keyed by section too, so a hash sent under another name misses
+            part = section_feature_cache.get((name, known[name]))
+            if part is None: missing.append(name)
+            else: features.update(part); hashes[name] = known[name]
+            continue
+        try: hashes[name], part = section_features(name, fields, extract, cv)
+        except (AttributeError, TypeError): return make_response(f"Invalid {name} section", 400)
+        features.update(part)
+    if missing: return {"missing": missing}, 409
+    score, rating, tips = score_features(features)
+    return {"score": score, "rating": rating, "tips": tips, "sections": hashes}
+
+def value_hash(value):
+    return hashlib.sha1(str(value).encode("utf-8")).hexdigest()[:12]
+
+@app.route("/api/preview", methods=["POST"])
+def preview_api():
+    # Body: {"cv": {...}, "template": "modern", "version": ..., "hashes":
+    # {key: hash}} as returned by the previous call. Only placeholder values
+    # whose hash changed are sent back; the whole marked-up page is included
+    # when the template changed or a changed key can't be patched in place.
+    payload, cv = api_payload()
+    known = payload.get("hashes") or {} if cv is not None else None
+    if not isinstance(known, dict): return make_response("Expected {\"cv\": {...}, \"hashes\": {...}}", 400)
+    tpl = template_store.get("cv", payload.get("template") or cv.get("template"), "classic")
+    try: keys = cv_keys(cv)
+    except (AttributeError, TypeError): return make_response("Invalid CV data", 400)
+    keys = {name: keys.get(name, "") for _, name in tpl.slots}
+    hashes = {name: value_hash(value) for name, value in keys.items()}
+    changed = {name: value for name, value in keys.items() if known.get(name) != hashes[name]}
+    out = {"template": tpl.name, "version": tpl.version, "hashes": hashes, "changed": changed}
+    if payload.get("version") != tpl.version or not tpl.patchable.issuperset(changed):
+        out["html"] = tpl.render_marked(keys)
+    return out
+
+@app.route("/analyze_batch", methods=["POST"])
+def analyze_batch_route():
+    denied = require_admin()
+    if denied: return denied
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict): payload = payload.get("cvs")
+    if not isinstance(payload, list): return make_response("Expected a JSON array of CVs", 400)
+    if len(payload) > SCORE_BATCH_MAX_ITEMS: return make_response(f"At most {SCORE_BATCH_MAX_ITEMS} CVs per batch", 413)
+    results = score_batch(payload)
+    return {"results": [{"score": r[0], "rating": r[1], "tips": r[2]} if r else {"error": "invalid CV"} for r in results]}
+
+@app.cli.command("score-saved")
+@click.option("--out", type=click.File("w"), default="-", help="JSON lines output; defaults to stdout.")
+@click.option("--chunk", default=2000, show_default=True, help="CVs scored per batch.")
+def score_saved_command(out, chunk):
+    cur = db().execute("SELECT slug, data_json, schema FROM cv_store ORDER BY id")
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows: break
+        for row, r in zip(rows, score_batch([decode_cv(row["schema"], row["data_json"]) for row in rows])):
+            item = {"slug": row["slug"], "score": r[0], "rating": r[1], "tips": r[2]} if r else {"slug": row["slug"], "error": "invalid CV"}
+            out.write(json.dumps(item) + "\n")
 
 @app.route("/analyze", methods=["POST"])
 def analyze_route():
@@ -435,9 +1905,162 @@ a.btn{{display:inline-block;text-decoration:none;margin-right:8px}}
     resp = make_response(html)
     resp.headers["Content-Type"] = "text/html; charset=utf-8"
     return resp
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    _stages.current = g.request_stages = {}
+
+@app.after_request
+def finish_request_timer(resp):
+    started, stages = g.pop("request_started", None), g.get("request_stages")
+    if started is None: return resp
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    method, path, status = request.method, request.path, resp.status_code
+    def done():
+        # runs once a streamed body has been sent too
+        elapsed = time.perf_counter() - started
+        _stages.current = None
+        metrics.observe("quickcv_request_seconds", elapsed, route=route, method=method, status=status)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            slow_requests.append({"time": datetime.utcnow().isoformat(timespec="seconds") + "Z", "route": route, "path": path,
+                                  "method": method, "status": status, "ms": round(elapsed * 1000, 1),
+                                  "stages_ms": {k: round(v * 1000, 1) for k, v in stages.items()}})
+    resp.call_on_close(done)
+    return resp
+
+def component_metrics():
+    out = [("quickcv_pdf_renders_total", "counter", {}, pdf_pool.renders),
+           ("quickcv_browser_launches_total", "counter", {}, pdf_pool.launches),
+           ("quickcv_browser_recycles_total", "counter", {}, pdf_pool.recycles),
+           ("quickcv_pdf_rejected_total", "counter", {}, pdf_pool.rejected),
+           ("quickcv_pdf_timed_out_total", "counter", {}, pdf_pool.timed_out),
+           ("quickcv_pdf_queue_depth", "gauge", {}, pdf_pool.jobs.qsize()),
+           ("quickcv_pdf_background_depth", "gauge", {}, pdf_pool.background.qsize()),
+           ("quickcv_pdf_active", "gauge", {}, pdf_pool.active)]
+    caches = {"pdf_memory": pdf_cache.memory, "pdf_disk": pdf_cache.disk, "shared_html": shared_html_cache,
+              "score_sections": section_feature_cache, "artifact_html": artifacts.stores["html"],
+              "artifact_pdf": artifacts.stores["pdf"]}
+    for name, cache in caches.items():
+        if cache is None: continue
+        out.append(("quickcv_cache_hits_total", "counter", {"cache": name}, cache.hits))
+        out.append(("quickcv_cache_misses_total", "counter", {"cache": name}, cache.misses))
+    if save_writer:
+        out.append(("quickcv_save_batches_total", "counter", {}, save_writer.batches))
+        out.append(("quickcv_saves_batched_total", "counter", {}, save_writer.saves))
+    if prerenderer:
+        for result in ("done", "dropped", "failed"):
+            out.append(("quickcv_prerender_total", "counter", {"result": result}, getattr(prerenderer, result)))
+    return out
+
+@app.route("/metrics", methods=["GET"])
+def metrics_route():
+    return Response(metrics.render(component_metrics()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/metrics/slow", methods=["GET"])
+def slow_requests_route():
+    # request paths can carry share slugs, so this one is admin-only
+    denied = require_admin()
+    if denied: return denied
+    return {"threshold_ms": SLOW_REQUEST_MS, "samples": list(reversed(slow_requests))}
+
+# Profiling: a request is wrapped in cProfile when an admin sends
+# "X-Profile: 1" or it falls in the PROFILE_SAMPLE_RATE sample. Only one
+# request is profiled at a time; PDF renders run on the browser threads, so
+# their time shows up as the wait in BrowserPool.run.
+_profile_lock = threading.Lock()
+
+def profile_wanted():
+    if request.path.startswith(("/profiles", "/metrics")): return False
+    if request.headers.get("X-Profile") == "1": return require_admin() is None
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@app.before_request
+def start_profile():
+    if not profile_wanted() or not _profile_lock.acquire(blocking=False): return
+    g.profile_id = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+    g.profile_started = time.perf_counter()
+    g.profile = cProfile.Profile()
+    g.profile.enable()
+
+def stop_profile(prof):
+    prof.disable()
+    _profile_lock.release()
+
+@app.after_request
+def finish_profile(resp):
+    prof = g.pop("profile", None)
+    if prof is None: return resp
+    info = {"id": g.profile_id, "time": datetime.utcnow().isoformat(timespec="seconds") + "Z", "method": request.method,
+            "path": request.path, "route": request.url_rule.rule if request.url_rule else "unmatched", "status": resp.status_code}
+    started = g.profile_started
+    def done():
+        stop_profile(prof)
+        info["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        save_profile(prof, info)
+    resp.call_on_close(done)
+    resp.headers["X-Profile-Id"] = info["id"]
+    return resp
+
+@app.teardown_request
+def abandon_profile(exc):
+    # after_request did not run, so nobody else will release the profiler
+    prof = g.pop("profile", None)
+    if prof is not None: stop_profile(prof)
+
+def save_profile(prof, info):
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(PROFILE_DIR / f"{info['id']}.prof")
+        (PROFILE_DIR / f"{info['id']}.json").write_text(json.dumps(info))
+        for old in sorted(PROFILE_DIR.glob("*.json"))[:-max(1, PROFILE_KEEP)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".prof").unlink(missing_ok=True)
+    except OSError:
+        app.logger.exception("Could not save profile %s", info["id"])
+
+def load_profiles():
+    out = []
+    for path in PROFILE_DIR.glob("*.json"):
+        try: out.append(json.loads(path.read_text()))
+        except (OSError, ValueError): continue
+    return sorted(out, key=lambda p: p.get("ms", 0), reverse=True)
+
+@app.route("/profiles", methods=["GET"])
+def profiles_index():
+    denied = require_admin()
+    if denied: return denied
+    rows = "".join(
+        f"<tr><td><a href='/profiles/{p['id']}'>{p['id']}</a></td><td>{p['ms']}</td><td>{p['method']}</td>"
+        f"<td>{p['route']}</td><td>{p['status']}</td><td>{p['time']}</td></tr>" for p in load_profiles())
+    html = f"""<!doctype html>
+<html><head><meta charset='utf-8'><title>Profiles</title>
+<style>body{{font-family:system-ui,-apple-system,Segoe UI,Roboto,Arial,sans-serif;margin:24px}}td,th{{padding:4px 10px;text-align:left}}</style>
+</head><body><h1>Slowest profiled requests</h1>
+<table><tr><th>Profile</th><th>ms</th><th>Method</th><th>Route</th><th>Status</th><th>Time</th></tr>{rows}</table>
+</body></html>"""
+    return make_response(html)
+
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def profile_detail(profile_id):
+    denied = require_admin()
+    if denied: return denied
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    if not re.fullmatch(r"[\w-]+", profile_id) or not path.exists():
+        return make_response("Not found", 404)
+    if request.args.get("download"):
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=path.name)
+    out = io.StringIO()
+    sort = request.args.get("sort", "cumulative")
+    pstats.Stats(str(path), stream=out).sort_stats(sort if sort in ("cumulative", "tottime", "calls") else "cumulative").print_stats(60)
+    return Response(out.getvalue(), content_type="text/plain; charset=utf-8")
+
 @app.route("/health")
 def health():
-    return {"ok": True}, 200
+    out = {"ok": True, "pdf_pool": pdf_pool.stats(), "pdf_cache": pdf_cache.stats()}
+    if save_writer: out["save_writer"] = save_writer.stats()
+    if prerenderer: out["prerender"] = prerenderer.stats()
+    out["artifacts"] = artifacts.stats()
+    return out, 200
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+# Async serving mode: uvicorn asgi:app --host 0.0.0.0 --port 10000
+# The PDF routes render on one shared Chromium through playwright.async_api so
+# a single process can keep many renders in flight; every other route is
+# handed to the Flask app unchanged.
+import asyncio, functools, io, json, os, re, time
+from asgiref.wsgi import WsgiToAsgi
+from playwright.async_api import async_playwright
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+
+from app import (app as flask_app, health, collect_data, load_shared, shared_meta, render_cv_html, render_cover_html,
+                 template_store, pdf_cache, artifacts, safe_filename, safe_get, Timings, RenderQueueFull, RenderTimeout,
+                 PDF_CV_OPTIONS, PDF_COVER_OPTIONS, PDF_POOL_MAX_RENDERS, PDF_QUEUE_MAX, PDF_QUEUE_WAIT,
+                 PDF_RENDER_TIMEOUT, PDF_LAUNCH_ARGS, PDF_READY_JS, pdf_fonts, with_pdf_fonts, pdf_backends, pdf_backend_for, render_pdf,
+                 render_fingerprint, normalize_pdf)
+
+PDF_ASYNC_CONCURRENCY = int(os.environ.get('PDF_ASYNC_CONCURRENCY', '16'))
+
+async def offline_route(route):
+    body = pdf_fonts.get(route.request.url)
+    if body is None: return await route.abort()
+    await route.fulfill(body=body, content_type="font/ttf", headers={"Access-Control-Allow-Origin": "*"})
+
+class BrowserGeneration:
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.idle = []
+        self.in_flight = 0
+        self.renders = 0
+        self.retired = False
+
+    async def close(self):
+        try: await self.browser.close()
+        except Exception: pass
+
+class AsyncBrowserPool:
+    # One browser per process with a pool of reusable pages. After
+    # max_renders the browser is replaced; the old one closes once its
+    # in-flight renders finish.
+    def __init__(self, concurrency=PDF_ASYNC_CONCURRENCY, max_renders=PDF_POOL_MAX_RENDERS,
+                 queue_max=PDF_QUEUE_MAX, queue_wait=PDF_QUEUE_WAIT):
+        self.concurrency = max(1, concurrency)
+        self.max_renders = max_renders
+        self.queue_max = queue_max
+        self.queue_wait = queue_wait
+        self.sem = asyncio.Semaphore(self.concurrency)
+        self.lock = asyncio.Lock()
+        self.pw = None
+        self.current = None
+        self.inflight = {}
+        self.waiting = 0
+        self.active = 0
+        self.launches = 0
+        self.recycles = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times = Timings()
+        self.render_times = Timings()
+
+    async def start(self):
+        if self.pw is None: self.pw = await async_playwright().start()
+
+    async def stop(self):
+        if self.current: await self.current.close()
+        self.current = None
+        if self.pw: await self.pw.stop()
+        self.pw = None
+
+    async def generation(self):
+        async with self.lock:
+            gen = self.current
+            if gen is None or not gen.browser.is_connected():
+                await self.start()
+                browser = await self.pw.chromium.launch(args=PDF_LAUNCH_ARGS)
+                context = await browser.new_context(service_workers="block")
+                await context.route("**/*", offline_route)
+                gen = self.current = BrowserGeneration(browser, context)
+                self.launches += 1
+            return gen
+
+    async def release(self, gen, page, ok):
+        gen.in_flight -= 1
+        if ok and not gen.retired: gen.idle.append(page)
+        else:
+            try: await page.close()
+            except Exception: pass
+        if not gen.retired and self.max_renders and gen.renders >= self.max_renders:
+            gen.retired = True
+            self.recycles += 1
+            if self.current is gen: self.current = None
+        if gen.retired and gen.in_flight == 0: await gen.close()
+
+    async def render(self, html, options):
+        if self.waiting >= self.queue_max:
+            self.rejected += 1
+            raise RenderQueueFull()
+        enqueued = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.sem.acquire(), self.queue_wait)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise RenderTimeout()
+        finally:
+            self.waiting -= 1
+        started = time.monotonic()
+        self.wait_times.add((started - enqueued) * 1000)
+        self.active += 1
+        try:
+            gen = await self.generation()
+            gen.in_flight += 1
+            page = gen.idle.pop() if gen.idle else await gen.context.new_page()
+            ok = False
+            try:
+                await page.set_content(with_pdf_fonts(html), wait_until="domcontentloaded")
+                await page.evaluate(PDF_READY_JS)
+                pdf = normalize_pdf(await page.pdf(**options))
+                ok = True
+                gen.renders += 1
+                return pdf
+            finally:
+                await self.release(gen, page, ok)
+        finally:
+            self.active -= 1
+            self.sem.release()
+            self.render_times.add((time.monotonic() - started) * 1000)
+
+    async def render_cached(self, html, options):
+        key = render_fingerprint(html, options, pdf_backends["chromium"])
+        pdf = await asyncio.to_thread(pdf_cache.get, key)
+        if pdf is not None: return pdf
+        fut = self.inflight.get(key)
+        if fut is not None: return await asyncio.shield(fut)
+        fut = self.inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            pdf = await asyncio.wait_for(self.render(html, options), self.queue_wait + PDF_RENDER_TIMEOUT)
+            await asyncio.to_thread(pdf_cache.put, key, pdf)
+            fut.set_result(pdf)
+            return pdf
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            fut.set_exception(RenderTimeout())
+            fut.exception()
+            raise RenderTimeout()
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()
+            raise
+        finally:
+            if not fut.done(): fut.cancel()
+            self.inflight.pop(key, None)
+
+    def retry_after(self):
+        per_render = (self.render_times.summary()["avg_ms"] or 1000) / 1000
+        return max(1, int(per_render * (self.waiting + 1) / self.concurrency + 0.999))
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "queue_max": self.queue_max,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait": self.wait_times.summary(),
+            "render": self.render_times.summary(),
+        }
+
+async def read_form(scope, receive):
+    body = bytearray()
+    while True:
+        msg = await receive()
+        body += msg.get("body", b"")
+        if not msg.get("more_body"): break
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    mimetype, options = parse_options_header(headers.get("content-type", ""))
+    _, form, _ = FormDataParser().parse(io.BytesIO(body), mimetype, len(body), options)
+    return form
+
+async def respond(send, status, body, headers=()):
+    if isinstance(body, str): body = body.encode("utf-8")
+    headers = [("content-length", str(len(body)))] + list(headers)
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+    await send({"type": "http.response.body", "body": body})
+
+class QuickCVAsgi:
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+        self.pool = AsyncBrowserPool()
+        handler = lambda fn: functools.partial(self.dispatch, fn)
+        self.routes = [
+            ("POST", re.compile(r"/generate_pdf"), handler(self.generate_pdf)),
+            ("POST", re.compile(r"/cover_pdf"), handler(self.cover_pdf)),
+            ("GET", re.compile(r"/p/([^/]+)\.pdf"), self.shared_pdf_route),
+            ("GET", re.compile(r"/health"), handler(self.health)),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan": return await self.lifespan(receive, send)
+        if scope["type"] == "http":
+            for method, pattern, handler in self.routes:
+                m = pattern.fullmatch(scope["path"])
+                if m and scope["method"] == method:
+                    return await handler(scope, receive, send, *m.groups())
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            msg = await receive()
+            if msg["type"] == "lifespan.startup":
+                await self.pool.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif msg["type"] == "lifespan.shutdown":
+                await self.pool.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def dispatch(self, handler, scope, receive, send, *args):
+        try:
+            status, body, headers = await handler(scope, receive, *args)
+        except RenderQueueFull:
+            status, body, headers = 429, "PDF renderer is busy, please retry shortly", [("retry-after", str(self.pool.retry_after()))]
+        except RenderTimeout:
+            status, body, headers = 503, "PDF rendering timed out, please retry", [("retry-after", str(self.pool.retry_after()))]
+        except Exception:
+            flask_app.logger.exception("Exception on %s [%s]", scope["path"], scope["method"])
+            status, body, headers = 500, "Internal Server Error", []
+        if not any(k == "content-type" for k, _ in headers): headers.append(("content-type", "text/plain; charset=utf-8"))
+        await respond(send, status, body, headers)
+
+    async def health(self, scope, receive):
+        payload, status = health()
+        payload["pdf_async"] = self.pool.stats()
+        return status, json.dumps(payload), [("content-type", "application/json")]
+
+    async def render(self, html, options, tpl):
+        backend = pdf_backend_for(tpl)
+        if backend.name == "chromium": return await self.pool.render_cached(html, options)
+        return await asyncio.to_thread(render_pdf, html, options, backend)
+
+    def pdf_headers(self, fname, disposition="attachment"):
+        return [("content-type", "application/pdf"), ("content-disposition", f"{disposition}; filename={fname}")]
+
+    async def generate_pdf(self, scope, receive):
+        data = collect_data(await read_form(scope, receive))
+        tpl = template_store.get("cv", data.get("template"), "classic")
+        fname = safe_filename(data.get("name")) + ".pdf"
+        return 200, await self.render(render_cv_html(data, tpl), PDF_CV_OPTIONS, tpl), self.pdf_headers(fname)
+
+    async def cover_pdf(self, scope, receive):
+        data = collect_data(await read_form(scope, receive))
+        tpl = template_store.get("cover", data.get("template"), "modern")
+        fname = safe_filename("Cover_Letter_" + safe_get(data,"name")) + ".pdf"
+        return 200, await self.render(render_cover_html(data, tpl), PDF_COVER_OPTIONS, tpl), self.pdf_headers(fname)
+
+    async def shared_pdf_route(self, scope, receive, send, slug):
+        # Artifact hits go to the Flask view, whose send_file streams the file
+        # with conditional and Range support; only misses render here.
+        meta = await asyncio.to_thread(shared_meta, slug)
+        if meta:
+            tpl = template_store.get("cv", meta["template"], "classic")
+            if await asyncio.to_thread(artifacts.pdf_path, slug, tpl, pdf_backend_for(tpl)):
+                return await self.wsgi(scope, receive, send)
+        return await self.dispatch(self.shared_pdf, scope, receive, send, slug, meta)
+
+    async def shared_pdf(self, scope, receive, slug, meta):
+        if not meta: return 404, "Not found", []
+        tpl = template_store.get("cv", meta["template"], "classic")
+        shared = await asyncio.to_thread(load_shared, slug)
+        if not shared: return 404, "Not found", []
+        data, _, created_at = shared
+        html = render_cv_html(data, tpl, created_at[:10])
+        pdf = await self.render(html, PDF_CV_OPTIONS, tpl)
+        await asyncio.to_thread(artifacts.put_pdf, slug, tpl, html, PDF_CV_OPTIONS, pdf_backend_for(tpl), pdf)
+        return 200, pdf, self.pdf_headers(f"{safe_filename('CV')}.pdf", "inline")
+
+app = QuickCVAsgi(flask_app)
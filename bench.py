@@ -0,0 +1,229 @@
+# Load and latency benchmark for every QuickCV route.
+#
+#   python bench.py --base-url http://127.0.0.1:10000 --server-pid $(pgrep -o gunicorn) --out bench.json
+#   python bench.py --baseline bench.json --out bench_new.json   # exits 1 on regression
+#
+# Payloads are synthetic CVs in the form shape collect_data() expects. Each
+# request gets its own seed (and /v, /p their own saved slug) so the PDF
+# cache doesn't turn the run into cache hits; --payloads fixed repeats one
+# payload to measure the cached path. The slugs are saved before the timed
+# run, so a server with PRERENDER=1 (the default) has usually pre-rendered
+# them: start it with PRERENDER=0 to measure renders on /v and /p. Each
+# result records the path it measured. Only the standard library is used so
+# it runs anywhere the app does.
+import argparse, json, os, random, re, sys, threading, time, urllib.error, urllib.parse, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SIZES = {
+    # roles, bullets per role, education entries, skills
+    "small": (1, 3, 1, 5),
+    "medium": (5, 5, 2, 12),
+    "large": (30, 12, 4, 30),
+}
+
+ROUTES = [
+    ("GET", "/", False),
+    ("POST", "/generate", True),
+    ("POST", "/generate_pdf", True),
+    ("POST", "/cover_html", True),
+    ("POST", "/cover_pdf", True),
+    ("POST", "/save", True),
+    ("GET", "/v/<slug>", True),
+    ("GET", "/p/<slug>.pdf", True),
+    ("POST", "/analyze", True),
+]
+
+VERBS = ["Led", "Built", "Improved", "Reduced", "Designed", "Managed", "Helped", "Worked on"]
+WORDS = "customer sales team process data reports system launch project budget quality training stock service delivery".split()
+
+def make_cv(size, seed=0, template="modern"):
+    rnd = random.Random(f"{size}:{seed}")
+    roles, bullets, edu, skills = SIZES[size]
+    sentence = lambda n: " ".join(rnd.choice(WORDS) for _ in range(n))
+    experience = [{
+        "title": f"Role {i}", "company": f"Company {i}", "location": "Leeds, UK",
+        "start": f"{2010 + i % 10}-0{1 + i % 9}", "end": f"{2011 + i % 10}",
+        "highlights": [f"{rnd.choice(VERBS)} {sentence(rnd.randint(5, 20))}" for _ in range(bullets)],
+    } for i in range(roles)]
+    education = [{"qualification": f"Qualification {i}", "institution": f"Institution {i}",
+                  "start": str(2000 + i), "end": str(2003 + i), "details": sentence(12)} for i in range(edu)]
+    return {
+        "name": f"Bench User {seed}", "role": "Software Engineer", "location": "Leeds, UK",
+        "email": "bench@example.com", "phone": "+44 7123 456 789", "website": "https://example.com",
+        "summary": sentence(40), "skills": ", ".join(f"Skill {i}" for i in range(skills)),
+        "experience_json": json.dumps(experience), "education_json": json.dumps(education),
+        "projects_json": "[]", "template": template,
+        "cover_company": "Example Ltd", "cover_role": "Engineer",
+    }
+
+def request(base_url, method, path, form=None, timeout=120):
+    data = urllib.parse.urlencode(form).encode() if form is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        body, status = e.read(), e.code
+    except OSError:
+        body, status = b"", 0
+    return status, (time.perf_counter() - start) * 1000, body
+
+def process_tree(root):
+    children = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit(): continue
+        try:
+            with open(f"/proc/{d}/stat") as f: ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError): continue
+        children.setdefault(ppid, []).append(int(d))
+    out, stack = [root], list(children.get(root, []))
+    while stack:
+        pid = stack.pop(); out.append(pid); stack.extend(children.get(pid, []))
+    return out
+
+def sample_resources(root):
+    rss_kb, chromium = 0, 0
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/comm") as f: comm = f.read().strip()
+            with open(f"/proc/{pid}/status") as f:
+                rss_kb += next((int(l.split()[1]) for l in f if l.startswith("VmRSS:")), 0)
+        except OSError: continue
+        if "chrom" in comm or "headless_shell" in comm: chromium += 1
+    return rss_kb // 1024, chromium
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.max_rss_mb = self.max_chromium = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            rss, chromium = sample_resources(self.pid)
+            self.max_rss_mb = max(self.max_rss_mb, rss)
+            self.max_chromium = max(self.max_chromium, chromium)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return {"max_rss_mb": self.max_rss_mb, "max_chromium": self.max_chromium}
+
+def percentile(xs, q):
+    if not xs: return 0.0
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 1)
+
+def run_route(args, method, make):
+    # make(i) gives the (path, form) for the i-th request, warmup included
+    for i in range(args.warmup): request(args.base_url, method, *make(i))
+    sampler = ResourceSampler(args.server_pid) if args.server_pid else None
+    if sampler: sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        results = list(ex.map(lambda i: request(args.base_url, method, *make(args.warmup + i))[:2], range(args.requests)))
+    wall = time.perf_counter() - start
+    latencies = [ms for status, ms in results if 200 <= status < 400]
+    statuses = {}
+    for status, _ in results: statuses[str(status)] = statuses.get(str(status), 0) + 1
+    out = {
+        "count": len(results), "errors": len(results) - len(latencies), "statuses": statuses,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50), "p95_ms": percentile(latencies, 0.95), "p99_ms": percentile(latencies, 0.99),
+    }
+    if sampler: out.update(sampler.stop())
+    return out
+
+def save_slug(base_url, form):
+    status, _, body = request(base_url, "POST", "/save", form)
+    m = re.search(rb"/v/([A-Za-z0-9]+)", body)
+    if status != 200 or not m: sys.exit(f"/save failed with status {status}; is the server running at {base_url}?")
+    return m.group(1).decode()
+
+def server_prerenders(base_url):
+    # /health only reports "prerender" when the server pre-renders saves
+    status, _, body = request(base_url, "GET", "/health")
+    try: return "prerender" in json.loads(body) if status == 200 else None
+    except ValueError: return None
+
+def measured_path(route, payloads, prerender):
+    if payloads == "fixed": return "cache"
+    if "<slug>" in route: return "render" if prerender is False else "artifact"
+    return "render" if "pdf" in route else "live"
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, cur in results.items():
+        old = baseline.get("results", {}).get(key)
+        if not old: continue
+        if old["p95_ms"] and cur["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {old['p95_ms']}ms -> {cur['p95_ms']}ms")
+        if old["rps"] and cur["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {old['rps']} -> {cur['rps']} req/s")
+        if cur["errors"] > old["errors"]:
+            regressions.append(f"{key}: errors {old['errors']} -> {cur['errors']}")
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark every QuickCV route.")
+    ap.add_argument("--base-url", default="http://127.0.0.1:10000")
+    ap.add_argument("--requests", type=int, default=50, help="requests per route and payload size")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--warmup", type=int, default=2)
+    ap.add_argument("--sizes", default="small,medium,large")
+    ap.add_argument("--routes", default="", help="comma-separated subset, e.g. /generate,/analyze")
+    ap.add_argument("--template", default="modern")
+    ap.add_argument("--payloads", choices=("unique", "fixed"), default="unique",
+                    help="unique: a new CV (and slug) per request, so renders are measured; fixed: one payload, cache hits")
+    ap.add_argument("--server-pid", type=int, help="server master pid; samples worker RSS and Chromium processes")
+    ap.add_argument("--out", help="write JSON results here")
+    ap.add_argument("--baseline", help="compare against an earlier --out file")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing")
+    args = ap.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    wanted = set(filter(None, args.routes.split(",")))
+    prerender = server_prerenders(args.base_url)
+    if prerender is not False and any("<slug>" in r for _, r, _ in ROUTES if not wanted or r in wanted):
+        print("note: the server pre-renders saved CVs (or /health is unreachable), so /v and /p measure artifact hits;"
+              " restart it with PRERENDER=0 to measure renders", file=sys.stderr)
+    results = {}
+    for method, route, sized in ROUTES:
+        if wanted and route not in wanted: continue
+        for size in (sizes if sized else ["-"]):
+            seeds = range(args.warmup + args.requests) if args.payloads == "unique" else [0]
+            forms = [make_cv(size, seed, template=args.template) if sized else None for seed in seeds]
+            if "<slug>" in route:
+                paths = [route.replace("<slug>", save_slug(args.base_url, form)) for form in forms]
+                make = lambda i, paths=paths: (paths[i % len(paths)], None)
+            else:
+                make = lambda i, forms=forms: (route, forms[i % len(forms)])
+            key = f"{method} {route} [{size}]"
+            results[key] = run_route(args, method, make)
+            results[key]["path"] = measured_path(route, args.payloads, prerender)
+            r = results[key]
+            print(f"{key:36} {r['rps']:8.2f} req/s  p50 {r['p50_ms']:8.1f}  p95 {r['p95_ms']:8.1f}  p99 {r['p99_ms']:8.1f} ms"
+                  f"  errors {r['errors']}" + (f"  rss {r['max_rss_mb']}MB chromium {r['max_chromium']}" if args.server_pid else ""))
+
+    report = {
+        "meta": {"base_url": args.base_url, "requests": args.requests, "concurrency": args.concurrency,
+                 "template": args.template, "payloads": args.payloads,
+                 "server_prerender": prerender, "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions: print("REGRESSION", line)
+        if regressions: return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
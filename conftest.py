@@ -0,0 +1,8 @@
+# Puts the repository root on sys.path so the tests can import app with a plain
+# `pytest` as well as `python -m pytest`, and points the app at a scratch
+# database and cache directories before it is first imported.
+import os, tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ.update(DB_PATH=os.path.join(_tmp, "test.db"), PRERENDER="0", ARTIFACT_DIR=os.path.join(_tmp, "artifacts"),
+                  PDF_CACHE_DIR=os.path.join(_tmp, "pdf_cache"), PROFILE_DIR=os.path.join(_tmp, "profiles"))
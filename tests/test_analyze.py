@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import app as quickcv
+
+# Inputs with the (score, rating, tips) the original single-CV analyze()
+# returned for them, or null where it raised. They cover the score band
+# edges, date formats, tip order and bullets whose first token is Unicode
+# (dotted/dotless i, long s, ligatures, fullwidth letters), where
+# bullet_stats has to agree with the old re.IGNORECASE match.
+GOLDEN = json.loads((Path(__file__).parent / "golden_scores.json").read_text(encoding="utf-8"))
+
+def expected(case):
+    return None if case["expected"] is None else tuple(case["expected"])
+
+def test_analyze_matches_golden():
+    for case in GOLDEN:
+        if case["expected"] is None:
+            with pytest.raises((AttributeError, TypeError)): quickcv.analyze(case["cv"])
+        else:
+            assert quickcv.analyze(case["cv"]) == expected(case), case["cv"]
+
+@pytest.mark.parametrize("text", ["İmproved the team", "Reſolved it", "ﬁxed", "Ｌed", "led,", "Ledger", "“Led”", "", "Optimized🚀 x"])
+def test_bullet_stats_matches_regex(text):
+    words, action = quickcv.bullet_stats(text)
+    assert words == len(text.split())
+    assert action == bool(quickcv.ACTION_RE.match(text.strip()))
+
+def test_score_batch_matches_golden():
+    # None where analyze() could not score the entry, in input order
+    assert quickcv.score_batch([case["cv"] for case in GOLDEN]) == [expected(case) for case in GOLDEN]
+
+def test_score_batch_all_invalid():
+    assert quickcv.score_batch([{"experience": 5}, {"skills": 3}]) == [None, None]
+    assert quickcv.score_batch([]) == []
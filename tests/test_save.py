@@ -0,0 +1,24 @@
+import threading
+
+import app as quickcv
+
+def test_batch_crosses_slug_block(monkeypatch):
+    # the block runs out partway through a batch, so the writer must not hold
+    # its write transaction while the allocator reserves the next block
+    monkeypatch.setattr(quickcv, "slug_allocator", quickcv.SlugAllocator(block=2))
+    writer = quickcv.SaveWriter(batch_ms=100)
+    record = {"data_json": "{}", "schema": quickcv.SCHEMA_JSON, "template": "classic", "created_at": "2024-01-01T00:00:00Z"}
+    slugs, errors = [], []
+    def save():
+        try: slugs.append(writer.submit(dict(record)))
+        except Exception as e: errors.append(e)
+    threads = [threading.Thread(target=save) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    writer.shutdown()
+    assert errors == []
+    assert len(set(slugs)) == 6
+    assert writer.failed == 0
+    with quickcv.db() as conn:
+        rows = conn.execute(f"SELECT COUNT(*) FROM cv_store WHERE slug IN ({','.join('?' * 6)})", slugs).fetchone()[0]
+    assert rows == 6
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import app as quickcv
+
+CV = {"name": "Zoë", "skills": ["SQL", "Excel"], "experience": [{"title": "T", "highlights": ["Led a team"]}], "education": []}
+
+def schemas():
+    out = [quickcv.SCHEMA_JSON, quickcv.SCHEMA_JSON_ZLIB]
+    if quickcv.msgpack: out.append(quickcv.SCHEMA_MSGPACK_ZLIB)
+    return out
+
+@pytest.mark.parametrize("schema", schemas())
+def test_encode_decode_round_trip(schema):
+    stored, blob = quickcv.encode_cv(CV, schema)
+    assert stored == schema
+    assert quickcv.decode_cv(stored, blob) == CV
+
+def test_big_integer_falls_back_to_json():
+    if not quickcv.msgpack: pytest.skip("msgpack is not installed")
+    data = dict(CV, experience=[{"title": "T", "years": 10 ** 20}])
+    schema, blob = quickcv.encode_cv(data, quickcv.SCHEMA_MSGPACK_ZLIB)
+    assert schema == quickcv.SCHEMA_JSON_ZLIB
+    assert quickcv.decode_cv(schema, blob) == data
+
+def test_legacy_row_is_migrated_on_read():
+    slug = quickcv.slug_allocator.next()
+    record = {"data_json": json.dumps(CV), "schema": quickcv.SCHEMA_JSON, "template": "classic", "created_at": "2024-01-01T00:00:00Z"}
+    with quickcv.db() as conn: quickcv.insert_shared(conn, slug, record)
+    assert quickcv.load_shared(slug) == (CV, "classic", "2024-01-01T00:00:00Z")
+    schema = quickcv.db().execute("SELECT schema FROM cv_store WHERE slug=?", (slug,)).fetchone()[0]
+    assert schema == quickcv.encode_cv(CV)[0]
+    assert quickcv.load_shared(slug) == (CV, "classic", "2024-01-01T00:00:00Z")
+
+def test_save_with_big_integer():
+    resp = quickcv.app.test_client().post("/save", data={"name": "X", "experience_json": '[{"title":"T","years":100000000000000000000}]'})
+    assert resp.status_code == 200